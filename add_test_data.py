@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """Скрипт для добавления тестовых данных в RepoRadar."""
 
-import sqlite3
 from datetime import datetime, timedelta
 import random
 
+from database import RepoRadarDB
+
 def add_test_data():
     """Добавить тестовые данные о переносах репозиториев."""
 
@@ -77,31 +78,19 @@ def add_test_data():
     ]
 
     # Подключение к базе данных
-    conn = sqlite3.connect('reporadar.db')
-    cursor = conn.cursor()
+    db = RepoRadarDB('reporadar.db')
 
-    # Добавление данных
-    for transfer in test_transfers:
-        try:
-            cursor.execute("""
-                INSERT OR IGNORE INTO repo_transfers
-                (repo, old_owner, new_owner, date, stars, language)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                transfer['repo'],
-                transfer['old_owner'],
-                transfer['new_owner'],
-                transfer['date'],
-                transfer['stars'],
-                transfer['language']
-            ))
+    # Добавление данных одной транзакцией
+    statuses = db.add_transfers(test_transfers)
+    for transfer, status in zip(test_transfers, statuses):
+        if status == 'inserted':
             print(f"Добавлен перенос: {transfer['repo']}")
-        except Exception as e:
-            print(f"Ошибка при добавлении {transfer['repo']}: {e}")
+        elif status == 'ignored':
+            print(f"Перенос уже есть: {transfer['repo']}")
+        else:
+            print(f"Ошибка при добавлении {transfer['repo']}")
 
-    conn.commit()
-    conn.close()
-    print(f"Добавлено {len(test_transfers)} тестовых переносов")
+    print(f"Добавлено {statuses.count('inserted')} тестовых переносов")
 
 if __name__ == '__main__':
     add_test_data()
\ No newline at end of file
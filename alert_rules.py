@@ -0,0 +1,141 @@
+"""Compiled alert rules for RepoRadar transfer notifications."""
+
+import logging
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SubstringMatcher:
+    """Aho-Corasick automaton finding which patterns occur in a text.
+
+    Built once from the patterns; matching walks the text a single time,
+    so its cost depends on the text length, not on the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """Build the automaton from (lowercased) patterns; empty patterns are ignored."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+
+        for pattern in patterns:
+            pattern = pattern.lower()
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                state = next_state
+            self._output[state] = self._output[state] or pattern
+
+        # Breadth-first pass to set failure links; a state inherits the match of its fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self._goto) - 1
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the first pattern found in ``text`` (case-insensitive), or None."""
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state] is not None:
+                return self._output[state]
+        return None
+
+
+class AlertRules:
+    """Decide which transfers trigger an alert.
+
+    A transfer alerts when any rule matches:
+
+    - its stars reach the threshold for its language (``language_min_stars``,
+      falling back to ``min_stars``)
+    - the new owner is one of ``buyers`` (exact, case-insensitive)
+    - the new owner contains one of ``target_buyers``
+    - the old owner is one of ``sellers``
+    - the new owner matches one of ``owner_patterns`` (regexes)
+
+    Rules are compiled once: exact owners into sets, substrings into one
+    Aho-Corasick automaton and regexes into one alternation, so evaluating
+    a transfer costs the same however many rules are configured.
+    """
+
+    def __init__(self, min_stars: int = 1000, target_buyers: Iterable[str] = (),
+                 buyers: Iterable[str] = (), sellers: Iterable[str] = (),
+                 language_min_stars: Optional[Dict[str, int]] = None,
+                 owner_patterns: Iterable[str] = ()):
+        """Compile the rules."""
+        self.min_stars = min_stars
+        self.language_min_stars = {language.lower(): stars
+                                   for language, stars in (language_min_stars or {}).items()}
+        self.buyers = {buyer.lower() for buyer in buyers}
+        self.sellers = {seller.lower() for seller in sellers}
+        self.buyer_substrings = SubstringMatcher(target_buyers)
+
+        patterns = []
+        for pattern in owner_patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                logger.error(f"Ignoring invalid owner pattern {pattern!r}: {e}")
+                continue
+            patterns.append(f"(?:{pattern})")
+        self.owner_regex = re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
+
+    @classmethod
+    def from_config(cls, alerts_config: Dict) -> 'AlertRules':
+        """Compile rules from the ``alerts`` config section."""
+        return cls(
+            min_stars=alerts_config.get('min_stars', 1000),
+            target_buyers=alerts_config.get('target_buyers') or [],
+            buyers=alerts_config.get('buyers') or [],
+            sellers=alerts_config.get('sellers') or [],
+            language_min_stars=alerts_config.get('language_min_stars') or {},
+            owner_patterns=alerts_config.get('owner_patterns') or []
+        )
+
+    def match(self, transfer: Dict) -> Optional[str]:
+        """Return why a transfer should alert, or None if no rule matches."""
+        stars = transfer.get('stars', 0) or 0
+        language = (transfer.get('language') or '').lower()
+        if stars >= self.language_min_stars.get(language, self.min_stars):
+            return 'stars'
+
+        new_owner = (transfer.get('new_owner') or '').lower()
+        if new_owner in self.buyers:
+            return f"buyer {new_owner}"
+        if self.sellers and (transfer.get('old_owner') or '').lower() in self.sellers:
+            return f"seller {transfer['old_owner']}"
+        if len(self.buyer_substrings):
+            found = self.buyer_substrings.search(new_owner)
+            if found:
+                return f"target buyer {found}"
+        if self.owner_regex and self.owner_regex.search(new_owner):
+            return 'owner pattern'
+        return None
+
+    def filter(self, transfers: Iterable[Dict]) -> List[Dict]:
+        """Return the transfers that should alert, in one pass."""
+        return [transfer for transfer in transfers if self.match(transfer) is not None]
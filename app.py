@@ -3,14 +3,18 @@
 import os
 import logging
 import yaml
-import schedule
-import time
 import threading
 from datetime import datetime
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, Response, jsonify, request, url_for
 
-from database import RepoRadarDB
+import exporters
+from alert_rules import AlertRules
+from database import ROLLUP_DIMENSIONS, ROLLUP_GRANULARITIES, RepoRadarDB, utc_timestamp
+from events_firehose import EventsFirehose
 from github_tracker import GitHubTracker
+from http_cache import HTTPCache
+from response_cache import ResponseCache
+from scheduler import PollScheduler, PollTiers
 from slack_notifier import SlackNotifier
 
 # Configure logging
@@ -27,8 +31,14 @@ app = Flask(__name__)
 db = None
 github_tracker = None
 slack_notifier = None
+firehose = None
+poll_scheduler = None
+alert_rules = None
 config = {}
 
+# Cache for the read endpoints, invalidated whenever the database is written
+response_cache = ResponseCache(lambda: db.get_generation() if db else None)
+
 
 def load_config(config_path: str = "config.yaml") -> dict:
     """Load configuration from YAML file."""
@@ -46,38 +56,95 @@ def load_config(config_path: str = "config.yaml") -> dict:
 
 def initialize_components():
     """Initialize database, GitHub tracker, and Slack notifier."""
-    global db, github_tracker, slack_notifier, config
+    global db, github_tracker, slack_notifier, firehose, alert_rules, config
     
     config = load_config()
     
     # Initialize database
     db_path = config.get('database_path', 'reporadar.db')
     db = RepoRadarDB(db_path)
+
+    cache_config = config.get('response_cache', {})
+    response_cache.max_age = cache_config.get('max_age', response_cache.max_age)
+    response_cache.max_entries = cache_config.get('max_entries', response_cache.max_entries)
     
     # Initialize GitHub tracker
-    github_token = config.get('github', {}).get('token')
-    if not github_token or github_token == "your_github_token_here":
+    github_config = config.get('github', {})
+    github_tokens = [github_config.get('token')] + list(github_config.get('tokens') or [])
+    github_tokens = [token for token in github_tokens if token and token != "your_github_token_here"]
+    if not github_tokens:
         logger.error("GitHub token not configured!")
         return False
         
-    github_tracker = GitHubTracker(github_token, db)
+    http_cache = None
+    if github_config.get('cache_enabled', True):
+        http_cache = HTTPCache(
+            github_config.get('cache_path', 'http_cache.db'),
+            max_bytes=int(github_config.get('cache_max_mb', 50)) * 1024 * 1024
+        )
+    github_tracker = GitHubTracker(
+        github_tokens,
+        db,
+        concurrency=github_config.get('concurrency', 1),
+        cache=http_cache,
+        backend=github_config.get('backend', 'rest'),
+        api_url=github_config.get('api_url', 'https://api.github.com'),
+        graphql_url=github_config.get('graphql_url'),
+        graphql_batch_size=github_config.get('graphql_batch_size', 100),
+        max_retries=github_config.get('max_retries', 3)
+    )
     
     # Initialize Slack notifier
-    slack_webhook = config.get('slack', {}).get('webhook_url')
-    slack_notifier = SlackNotifier(slack_webhook)
+    slack_config = config.get('slack', {})
+    slack_webhook = slack_config.get('webhook_url')
+    slack_notifier = SlackNotifier(
+        slack_webhook,
+        db=db if slack_config.get('outbox', True) else None,
+        coalesce_seconds=slack_config.get('coalesce_seconds', 5),
+        min_interval=slack_config.get('min_interval', 1.0),
+        max_attempts=slack_config.get('max_attempts', 8)
+    )
+    slack_notifier.start()
+
+    # Compile alert rules once; they're evaluated for every detected transfer
+    alert_rules = AlertRules.from_config(config.get('alerts', {}))
+
+    # Initialize global events ingester (optional)
+    firehose_config = config.get('firehose', {})
+    if firehose_config.get('enabled', False):
+        firehose = EventsFirehose(
+            github_tracker,
+            db,
+            pages=firehose_config.get('pages', 3),
+            seen_size=firehose_config.get('seen_size', 10000),
+            min_poll_interval=firehose_config.get('min_poll_interval', 60)
+        )
     
     logger.info("All components initialized successfully")
     return True
 
 
-def check_repositories():
-    """Scheduled function to check repositories for transfers."""
+def send_alerts(transfers):
+    """Send Slack alerts for qualifying transfers."""
+    if not transfers:
+        return
+    slack_notifier.send_batch_alert(transfers, rules=alert_rules)
+
+
+def check_repositories(repositories=None, organizations=None):
+    """Scheduled function to check repositories for transfers.
+
+    Checks the given repositories and organizations, or everything in the
+    config when called without arguments.
+    """
     logger.info("Starting repository check...")
     
     try:
         # Get repositories and organizations from config
-        repositories = config.get('repositories', [])
-        organizations = config.get('organizations', [])
+        if repositories is None:
+            repositories = config.get('repositories', [])
+        if organizations is None:
+            organizations = config.get('organizations', [])
         
         all_transfers = []
         
@@ -92,32 +159,65 @@ def check_repositories():
             all_transfers.extend(transfers)
         
         # Send Slack alerts for qualifying transfers
-        if all_transfers:
-            alerts_config = config.get('alerts', {})
-            min_stars = alerts_config.get('min_stars', 1000)
-            target_buyers = alerts_config.get('target_buyers', [])
-            
-            slack_notifier.send_batch_alert(all_transfers, target_buyers, min_stars)
+        send_alerts(all_transfers)
             
         logger.info(f"Repository check completed. Found {len(all_transfers)} transfers.")
+        if github_tracker.cache:
+            logger.info(f"HTTP cache stats: {github_tracker.cache.stats()}")
+        logger.info(f"Rate limiter: {github_tracker.token_pool.stats()}")
         
     except Exception as e:
         logger.error(f"Error during repository check: {e}")
 
 
-def start_scheduler():
-    """Start the background scheduler for repository polling."""
+def build_poll_tiers():
+    """Build polling tiers from the scheduler config."""
     poll_interval = config.get('poll_interval', 15)
-    schedule.every(poll_interval).minutes.do(check_repositories)
-    
-    def run_scheduler():
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
-    
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    logger.info(f"Scheduler started. Polling every {poll_interval} minutes.")
+    scheduler_config = config.get('scheduler', {})
+    return PollTiers(
+        tiers=dict({'normal': poll_interval, 'organization': poll_interval},
+                   **scheduler_config.get('tiers', {})),
+        hot_min_stars=scheduler_config.get('hot_min_stars', 10000),
+        target_buyers=config.get('alerts', {}).get('target_buyers', []),
+        dormant_days=scheduler_config.get('dormant_days', 30)
+    )
+
+
+def start_firehose():
+    """Follow the global events timeline in a background thread, if enabled."""
+    if not firehose:
+        return
+    firehose_thread = threading.Thread(
+        target=firehose.run, kwargs={'on_transfers': send_alerts}, daemon=True
+    )
+    firehose_thread.start()
+    logger.info(f"Firehose started. Following /events ({firehose.pages} pages per poll).")
+
+
+def start_scheduler():
+    """Start the background scheduler for repository polling.
+
+    With ``poller.mode: standalone`` nothing is polled in the web process;
+    ``poller.py`` workers take the work from the shared queue instead.
+    """
+    global poll_scheduler
+
+    if config.get('poller', {}).get('mode', 'embedded') == 'standalone':
+        logger.info("Polling runs in standalone poller workers (poller.py); scheduler not started.")
+        return
+
+    poll_scheduler = PollScheduler(
+        check_repositories,
+        db,
+        repositories=config.get('repositories', []),
+        organizations=config.get('organizations', []),
+        tiers=build_poll_tiers(),
+        max_batch=config.get('scheduler', {}).get('max_batch', 500)
+    )
+    poll_scheduler.start()
+    start_firehose()
+    logger.info(f"Scheduler started. Tiers: {poll_scheduler.stats()['tiers']}, "
+                f"intervals: {poll_scheduler.stats()['intervals_minutes']} minutes.")
 
 
 # HTML template for the feed page
@@ -141,6 +241,9 @@ FEED_TEMPLATE = """
         .no-transfers { text-align: center; color: #999; padding: 40px; }
         .refresh-btn { background: #3498db; color: white; padding: 10px 20px; border: none; border-radius: 5px; cursor: pointer; }
         .refresh-btn:hover { background: #2980b9; }
+        .filters { margin-top: 10px; font-size: 14px; }
+        .filters input { padding: 4px; margin-right: 8px; width: 120px; }
+        .pagination { text-align: center; margin-top: 20px; }
     </style>
 </head>
 <body>
@@ -149,6 +252,12 @@ FEED_TEMPLATE = """
             <h1>🔍 RepoRadar - Repository Transfer Feed</h1>
             <p>Tracking GitHub repository ownership changes and acquisitions</p>
             <button class="refresh-btn" onclick="location.reload()">🔄 Refresh</button>
+            <form class="filters" method="get" action="{{ feed_url }}">
+                <input type="text" name="language" placeholder="Language" value="{{ filters.language or '' }}">
+                <input type="number" name="min_stars" placeholder="Min stars" value="{{ filters.min_stars or '' }}">
+                <input type="text" name="buyer" placeholder="Buyer" value="{{ filters.buyer or '' }}">
+                <button type="submit">Filter</button>
+            </form>
         </div>
         
         {% if transfers %}
@@ -169,6 +278,9 @@ FEED_TEMPLATE = """
                 <div class="date">{{ transfer.date[:19] }}</div>
             </div>
             {% endfor %}
+            {% if next_url %}
+            <div class="pagination"><a href="{{ next_url }}">Older transfers →</a></div>
+            {% endif %}
         {% else %}
             <div class="no-transfers">
                 <h3>No transfers detected yet</h3>
@@ -180,6 +292,12 @@ FEED_TEMPLATE = """
 </html>
 """
 
+# Compiled once at import instead of being looked up by source on every request
+feed_template = app.jinja_env.from_string(FEED_TEMPLATE)
+
+# Transfers shown per feed page
+FEED_PAGE_SIZE = 50
+
 
 @app.route('/')
 def index():
@@ -188,13 +306,36 @@ def index():
 
 
 @app.route('/feed')
+@response_cache.cached
 def feed():
-    """HTML feed page showing recent repository transfers."""
-    transfers = db.get_transfers(limit=50)
-    return render_template_string(FEED_TEMPLATE, transfers=transfers)
+    """HTML feed page showing repository transfers, newest first.
+
+    Supports keyset pagination (``?before=<id>``) and filtering by
+    ``language``, ``min_stars`` and ``buyer``.
+    """
+    filters = {
+        'language': request.args.get('language') or None,
+        'min_stars': request.args.get('min_stars', type=int),
+        'buyer': request.args.get('buyer') or None
+    }
+    before = request.args.get('before', type=int)
+    transfers = db.get_transfers_page(before=before, limit=FEED_PAGE_SIZE, **filters)
+
+    next_url = None
+    if len(transfers) == FEED_PAGE_SIZE:
+        active_filters = {name: value for name, value in filters.items() if value}
+        next_url = url_for('feed', before=transfers[-1]['id'], **active_filters)
+
+    return feed_template.render(
+        transfers=transfers,
+        filters=filters,
+        feed_url=url_for('feed'),
+        next_url=next_url
+    )
 
 
 @app.route('/stats')
+@response_cache.cached
 def stats():
     """JSON statistics endpoint."""
     stats = db.get_stats()
@@ -205,16 +346,89 @@ def stats():
     })
 
 
+@app.route('/timeseries')
+@response_cache.cached
+def timeseries():
+    """JSON time series of transfers from the pre-aggregated rollups.
+
+    Query parameters:
+        granularity: hour, day (default) or week
+        start, end: ISO timestamps bounding the range (inclusive buckets, UTC
+            unless an offset is given)
+        dimension: all (default), language, buyer or stars_bucket
+        value: only this language/buyer/star bucket; all values if omitted
+    """
+    granularity = request.args.get('granularity', 'day')
+    dimension = request.args.get('dimension', 'all')
+    if granularity not in ROLLUP_GRANULARITIES:
+        return jsonify({'status': 'error', 'message': f"Unknown granularity: {granularity}"}), 400
+    if dimension not in ROLLUP_DIMENSIONS:
+        return jsonify({'status': 'error', 'message': f"Unknown dimension: {dimension}"}), 400
+
+    bounds = {}
+    for name in ('start', 'end'):
+        raw = request.args.get(name)
+        if raw:
+            try:
+                bounds[name] = utc_timestamp(raw)
+            except ValueError:
+                return jsonify({'status': 'error', 'message': f"Invalid {name}: {raw}"}), 400
+
+    series = db.get_timeseries(granularity, dimension, request.args.get('value'), **bounds)
+    return jsonify({
+        'status': 'success',
+        'granularity': granularity,
+        'dimension': dimension,
+        'data': series,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
 @app.route('/export')
+@response_cache.cached
 def export_data():
-    """Export all transfer data as JSON for dashboard generation."""
+    """Stream transfer data for dashboard generation and bulk export.
+
+    Query parameters:
+        format: json (default envelope), ndjson, csv, parquet or arrow
+        after: only rows with an id greater than this (keyset cursor)
+        since: only rows stored at or after this UTC timestamp
+        limit: maximum number of rows
+    Rows are streamed in id order straight from the database, so the
+    export covers the full history at constant memory.
+    """
+    fmt = request.args.get('format', 'json')
+    if fmt not in exporters.EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': f"Unknown format: {fmt}"}), 400
+    if fmt in ('parquet', 'arrow') and exporters.pa is None:
+        return jsonify({'status': 'error', 'message': f"{fmt} export requires pyarrow"}), 501
+
+    after = request.args.get('after', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    since = request.args.get('since')
+    if since:
+        # Validate up front; once streaming starts the status can't change
+        try:
+            since = utc_timestamp(since)
+        except ValueError:
+            return jsonify({'status': 'error', 'message': f"Invalid since: {since}"}), 400
+
     try:
-        transfers = db.get_transfers(limit=1000)  # Получить последние 1000 переносов
-        return jsonify({
-            'status': 'success',
-            'data': transfers,
-            'timestamp': datetime.now().isoformat()
-        })
+        rows = db.iter_transfers(after=after, since=since, limit=limit)
+        if fmt == 'json':
+            body = exporters.json_stream(rows, datetime.now().isoformat())
+        elif fmt == 'ndjson':
+            body = exporters.ndjson_stream(rows)
+        elif fmt == 'csv':
+            body = exporters.csv_stream(rows)
+        else:
+            body = exporters.arrow_stream(rows, fmt)
+
+        mimetype, extension = exporters.EXPORT_FORMATS[fmt]
+        response = Response(body, mimetype=mimetype)
+        if extension:
+            response.headers['Content-Disposition'] = f'attachment; filename=reporadar-transfers.{extension}'
+        return response
     except Exception as e:
         logger.error(f"Export error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -230,7 +444,15 @@ def health():
             'database': db is not None,
             'github_tracker': github_tracker is not None,
             'slack_notifier': slack_notifier is not None
-        }
+        },
+        'http_cache': github_tracker.cache.stats() if github_tracker and github_tracker.cache else None,
+        'response_cache': response_cache.stats(),
+        'token_pool': github_tracker.token_pool.stats() if github_tracker else None,
+        'firehose': dict(firehose.stats, poll_interval=firehose.poll_interval) if firehose else None,
+        'scheduler': poll_scheduler.stats() if poll_scheduler else None,
+        'slack': slack_notifier.outbox_stats() if slack_notifier else None,
+        'work_queue': (db.get_work_queue_stats()
+                       if db and config.get('poller', {}).get('mode') == 'standalone' else None)
     })
 
 
@@ -1,13 +1,26 @@
 import requests
+import matplotlib
+matplotlib.use('Agg')  # Рисование без дисплея, в том числе в процессах-воркерах
 import matplotlib.pyplot as plt
 import seaborn as sns
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+import hashlib
+import json
 import os
+import sys
 
 # Настройки
 REPORADAR_URL = os.getenv('REPORADAR_URL', 'https://your-reporadar-app.herokuapp.com')
 CHARTS_DIR = 'charts'
+# Локальный колоночный кэш переносов; между запусками докачиваются только новые строки
+CACHE_PATH = os.getenv('REPORADAR_CACHE', 'data/transfers.parquet')
+# Хэши входных данных последней отрисовки графиков
+HASHES_FILE = '.hashes.json'
+TRANSFER_COLUMNS = ['id', 'repo', 'old_owner', 'new_owner', 'date', 'stars', 'language',
+                    'created_at', 'first_seen', 'last_seen', 'seen_count']
 
 def get_stats():
     """Получить статистику из RepoRadar."""
@@ -19,99 +32,198 @@ def get_stats():
         print(f"Error getting stats: {e}")
         return None
 
-def get_transfers():
-    """Получить данные о переносах."""
-    try:
-        response = requests.get(f'{REPORADAR_URL}/export', timeout=10)
+def normalize_transfers(transfers):
+    """Привести типы колонок: целые числа и None вместо NaN в текстовых полях."""
+    transfers = transfers.astype({'id': 'int64', 'stars': 'int64', 'seen_count': 'int64'})
+    for column in TRANSFER_COLUMNS:
+        if transfers[column].dtype != 'int64':
+            values = transfers[column].astype(object)
+            transfers[column] = values.where(values.notna(), None)
+    return transfers
+
+def load_cache():
+    """Загрузить локальный кэш переносов."""
+    if os.path.exists(CACHE_PATH):
+        try:
+            return normalize_transfers(pd.read_parquet(CACHE_PATH))
+        except Exception as e:
+            print(f"Error reading cache, starting over: {e}")
+    return pd.DataFrame(columns=TRANSFER_COLUMNS)
+
+def fetch_transfers(after=0):
+    """Получить переносы с id больше after (ndjson-поток /export)."""
+    rows = []
+    with requests.get(f'{REPORADAR_URL}/export', params={'format': 'ndjson', 'after': after},
+                      stream=True, timeout=(10, 60)) as response:
         response.raise_for_status()
-        return response.json()['data']
+        for line in response.iter_lines():
+            if line:
+                rows.append(json.loads(line))
+    return pd.DataFrame(rows, columns=TRANSFER_COLUMNS)
+
+def sync_transfers(full=False):
+    """Дополнить кэш новыми переносами и вернуть все переносы одним DataFrame.
+
+    Высшая отметка - максимальный id в кэше; с сервера запрашиваются только
+    строки после нее. full=True перекачивает все (например, чтобы обновить
+    звезды уже известных переносов).
+    """
+    cached = pd.DataFrame(columns=TRANSFER_COLUMNS) if full else load_cache()
+    after = int(cached['id'].max()) if len(cached) else 0
+    try:
+        new_rows = fetch_transfers(after)
     except Exception as e:
         print(f"Error getting transfers: {e}")
-        return []
+        return cached
 
-def generate_overview_chart(stats):
-    """Генерировать общий обзор."""
-    if not stats:
-        return
+    print(f"Новых переносов: {len(new_rows)} (в кэше: {len(cached)})")
+    if new_rows.empty:
+        return cached
+
+    frames = [frame for frame in (cached, new_rows) if not frame.empty]
+    transfers = pd.concat(frames, ignore_index=True).drop_duplicates('id', keep='last')
+    transfers = normalize_transfers(transfers)
+    os.makedirs(os.path.dirname(CACHE_PATH) or '.', exist_ok=True)
+    transfers.to_parquet(CACHE_PATH, index=False)
+    return transfers
+
+def compute_chart_data(stats, transfers):
+    """Посчитать входные данные всех графиков векторными операциями pandas/NumPy.
+
+    Возвращает небольшие словари (без исходных строк): их легко передать в
+    процесс-воркер и по ним же считается хэш для пропуска перерисовки.
+    """
+    buyers = (stats.get('top_buyers') or [])[:10]
+    overview = {
+        'totals': [stats.get('total_transfers', 0), stats.get('unique_buyers', 0), stats.get('unique_sellers', 0)],
+        'buyer_names': [b['new_owner'][:15] + '...' if len(b['new_owner']) > 15 else b['new_owner'] for b in buyers],
+        'buyer_counts': [b['count'] for b in buyers],
+        'star_counts': [],
+        'star_edges': [],
+        'daily_dates': [],
+        'daily_counts': []
+    }
+
+    # Распределение по звездам: гистограмма считается здесь, рисуются только 20 столбцов
+    stars = transfers['stars'].to_numpy()
+    stars = stars[stars > 0]
+    if stars.size:
+        counts, edges = np.histogram(stars, bins=20)
+        overview['star_counts'] = counts.tolist()
+        overview['star_edges'] = edges.tolist()
+
+    # Динамика по дням: разбор дат одним вызовом, нераспознанные значения отбрасываются
+    dates = pd.to_datetime(transfers['created_at'], format='ISO8601', errors='coerce', utc=True).dropna()
+    if not dates.empty:
+        daily = dates.dt.date.value_counts().sort_index().tail(30)
+        overview['daily_dates'] = [d.isoformat() for d in daily.index]
+        overview['daily_counts'] = daily.tolist()
+
+    languages = transfers['language'].dropna()
+    top_langs = languages[languages != ''].value_counts().head(10)
+    return {
+        'overview': overview,
+        'languages': {'langs': top_langs.index.tolist(), 'counts': top_langs.tolist()}
+    }
 
+def render_overview_chart(data, path):
+    """Нарисовать общий обзор."""
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
     fig.suptitle('RepoRadar Dashboard - Обзор рынка репозиториев', fontsize=16)
 
     # Общая статистика
     labels = ['Всего переносов', 'Уникальных покупателей', 'Уникальных продавцов']
-    values = [stats.get('total_transfers', 0), stats.get('unique_buyers', 0), stats.get('unique_sellers', 0)]
-    ax1.bar(labels, values, color=['#1f77b4', '#ff7f0e', '#2ca02c'])
+    ax1.bar(labels, data['totals'], color=['#1f77b4', '#ff7f0e', '#2ca02c'])
     ax1.set_title('Общая статистика')
     ax1.tick_params(axis='x', rotation=45)
 
     # Топ покупателей
-    if 'top_buyers' in stats and stats['top_buyers']:
-        buyers = stats['top_buyers'][:10]
-        names = [b['new_owner'][:15] + '...' if len(b['new_owner']) > 15 else b['new_owner'] for b in buyers]
-        counts = [b['count'] for b in buyers]
-        ax2.barh(names[::-1], counts[::-1], color='#1f77b4')
+    if data['buyer_names']:
+        ax2.barh(data['buyer_names'][::-1], data['buyer_counts'][::-1], color='#1f77b4')
         ax2.set_title('Топ 10 покупателей')
 
     # Распределение по звездам
-    transfers = get_transfers()
-    if transfers:
-        stars = [t.get('stars', 0) for t in transfers if t.get('stars', 0) > 0]
-        if stars:
-            ax3.hist(stars, bins=20, color='#ff7f0e', alpha=0.7)
-            ax3.set_title('Распределение по звездам')
-            ax3.set_xlabel('Количество звезд')
-            ax3.set_ylabel('Количество репозиториев')
+    if data['star_counts']:
+        edges = data['star_edges']
+        ax3.hist(edges[:-1], bins=edges, weights=data['star_counts'], color='#ff7f0e', alpha=0.7)
+        ax3.set_title('Распределение по звездам')
+        ax3.set_xlabel('Количество звезд')
+        ax3.set_ylabel('Количество репозиториев')
 
     # Динамика (если есть данные по времени)
-    if transfers:
-        dates = []
-        for t in transfers:
-            if 'created_at' in t:
-                try:
-                    date = datetime.fromisoformat(t['created_at'].replace('Z', '+00:00'))
-                    dates.append(date.date())
-                except:
-                    pass
+    if data['daily_dates']:
+        dates = [datetime.fromisoformat(d).date() for d in data['daily_dates']]
+        ax4.plot(dates, data['daily_counts'], color='#2ca02c')
+        ax4.set_title('Динамика переносов (последние 30 дней)')
+        ax4.tick_params(axis='x', rotation=45)
 
-        if dates:
-            date_counts = pd.Series(dates).value_counts().sort_index()
-            ax4.plot(date_counts.index[-30:], date_counts.values[-30:], color='#2ca02c')
-            ax4.set_title('Динамика переносов (последние 30 дней)')
-            ax4.tick_params(axis='x', rotation=45)
+    plt.tight_layout()
+    plt.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
 
+def render_language_chart(data, path):
+    """Нарисовать график по языкам программирования."""
+    plt.figure(figsize=(10, 6))
+    plt.bar(data['langs'], data['counts'], color='#9467bd')
+    plt.title('Популярные языки в перенесенных репозиториях')
+    plt.xticks(rotation=45, ha='right')
+    plt.ylabel('Количество репозиториев')
     plt.tight_layout()
-    os.makedirs(CHARTS_DIR, exist_ok=True)
-    plt.savefig(f'{CHARTS_DIR}/overview.png', dpi=150, bbox_inches='tight')
+    plt.savefig(path, dpi=150, bbox_inches='tight')
     plt.close()
 
-def generate_language_chart():
-    """Генерировать график по языкам программирования."""
-    transfers = get_transfers()
-    if not transfers:
-        return
+# График -> (функция отрисовки, файл)
+CHARTS = {
+    'overview': (render_overview_chart, 'overview.png'),
+    'languages': (render_language_chart, 'languages.png')
+}
+
+def data_hash(data):
+    """Хэш входных данных графика."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def generate_charts(stats, transfers):
+    """Перерисовать графики, входные данные которых изменились, параллельно в пуле процессов.
+
+    Хэши данных последней отрисовки хранятся в charts/.hashes.json; если хэш
+    совпал и файл на месте, график не перерисовывается.
+    """
+    os.makedirs(CHARTS_DIR, exist_ok=True)
+    hashes_path = os.path.join(CHARTS_DIR, HASHES_FILE)
+    try:
+        with open(hashes_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
 
-    languages = {}
-    for t in transfers:
-        lang = t.get('language', 'Unknown')
-        if lang:
-            languages[lang] = languages.get(lang, 0) + 1
-
-    if languages:
-        top_langs = sorted(languages.items(), key=lambda x: x[1], reverse=True)[:10]
-        langs, counts = zip(*top_langs)
-
-        plt.figure(figsize=(10, 6))
-        plt.bar(langs, counts, color='#9467bd')
-        plt.title('Популярные языки в перенесенных репозиториях')
-        plt.xticks(rotation=45, ha='right')
-        plt.ylabel('Количество репозиториев')
-        plt.tight_layout()
-        plt.savefig(f'{CHARTS_DIR}/languages.png', dpi=150, bbox_inches='tight')
-        plt.close()
-
-def update_readme():
+    chart_data = compute_chart_data(stats, transfers)
+    chart_data = {name: data for name, data in chart_data.items()
+                  if name != 'languages' or data['langs']}
+    hashes = {name: data_hash(data) for name, data in chart_data.items()}
+    stale = [name for name in chart_data
+             if hashes[name] != previous.get(name)
+             or not os.path.exists(os.path.join(CHARTS_DIR, CHARTS[name][1]))]
+
+    if stale:
+        with ProcessPoolExecutor(max_workers=len(stale)) as executor:
+            futures = {
+                name: executor.submit(CHARTS[name][0], chart_data[name], os.path.join(CHARTS_DIR, CHARTS[name][1]))
+                for name in stale
+            }
+            for name, future in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error rendering {name}: {e}")
+                    hashes.pop(name, None)
+
+    print(f"Графики перерисованы: {', '.join(stale) or 'нет'}; без изменений: "
+          f"{', '.join(name for name in chart_data if name not in stale) or 'нет'}")
+    with open(hashes_path, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+
+def update_readme(stats, transfers):
     """Обновить README.md с актуальными данными."""
-    stats = get_stats()
     if not stats:
         return
 
@@ -137,8 +249,8 @@ def update_readme():
 |-------------|----------------|----------------|--------|------|
 """
 
-    transfers = get_transfers()[:10]  # Последние 10
-    for t in transfers:
+    # Последние 10 по id
+    for t in transfers.sort_values('id', ascending=False).head(10).to_dict('records'):
         repo = t.get('repo', 'N/A')
         old_owner = t.get('old_owner', 'N/A')
         new_owner = t.get('new_owner', 'N/A')
@@ -153,11 +265,12 @@ def update_readme():
 
 if __name__ == '__main__':
     print("Генерация графиков...")
+    # Одна загрузка /stats и одна докачка /export на весь запуск
     stats = get_stats()
     if stats:
-        generate_overview_chart(stats)
-        generate_language_chart()
-        update_readme()
+        transfers = sync_transfers(full='--full' in sys.argv)
+        generate_charts(stats, transfers)
+        update_readme(stats, transfers)
         print("Готово!")
     else:
         print("Не удалось получить данные из RepoRadar")
\ No newline at end of file
@@ -1,100 +1,1377 @@
 """Database management for RepoRadar."""
 
+import argparse
+import json
+import os
 import sqlite3
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection. WAL lets readers proceed while a write is in
+# progress; synchronous=NORMAL is durable under WAL except on power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+)
+
+TRANSFERS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        transfer_key TEXT NOT NULL UNIQUE,
+        repo TEXT NOT NULL,
+        old_owner TEXT NOT NULL,
+        new_owner TEXT NOT NULL,
+        date TEXT NOT NULL,
+        stars INTEGER DEFAULT 0,
+        language TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        first_seen TEXT NOT NULL,
+        last_seen TEXT NOT NULL,
+        seen_count INTEGER NOT NULL DEFAULT 1
+    )
+"""
+
+
+# Recomputes the materialized statistics from repo_transfers. Used to populate
+# them when they are created and by ``RepoRadarDB.rebuild_stats``.
+REBUILD_STATS_SQL = """
+    DELETE FROM owner_stats;
+    INSERT INTO owner_stats (owner, bought, sold)
+    SELECT owner, SUM(bought), SUM(sold) FROM (
+        SELECT new_owner AS owner, COUNT(*) AS bought, 0 AS sold FROM repo_transfers GROUP BY new_owner
+        UNION ALL
+        SELECT old_owner AS owner, 0 AS bought, COUNT(*) AS sold FROM repo_transfers GROUP BY old_owner
+    )
+    GROUP BY owner;
+    UPDATE transfer_totals SET
+        total_transfers = (SELECT COUNT(*) FROM repo_transfers),
+        unique_buyers = (SELECT COUNT(*) FROM owner_stats WHERE bought > 0),
+        unique_sellers = (SELECT COUNT(*) FROM owner_stats WHERE sold > 0),
+        stars_sum = (SELECT COALESCE(SUM(stars), 0) FROM repo_transfers),
+        stars_count = (SELECT COUNT(stars) FROM repo_transfers),
+        max_stars = (SELECT MAX(stars) FROM repo_transfers)
+    WHERE id = 1;
+"""
+
+# Time-series rollups of repo_transfers: transfer count and star sum per time
+# bucket, broken down by one dimension at a time. Buckets follow the event
+# time (``date``, normalized to UTC) so backfilled transfers land where they
+# happened; rows whose date can't be parsed fall back to ``created_at``.
+ROLLUP_GRANULARITIES = {
+    'hour': "strftime('%Y-%m-%d %H:00:00', {ts})",
+    'day': "date({ts})",
+    'week': "date({ts}, 'weekday 0', '-6 days')",  # Monday of the week
+}
+ROLLUP_DIMENSIONS = {
+    'all': "''",
+    'language': "COALESCE({row}.language, '')",
+    'buyer': "{row}.new_owner",
+    'stars_bucket': """CASE
+        WHEN COALESCE({row}.stars, 0) = 0 THEN '0'
+        WHEN {row}.stars < 100 THEN '1-99'
+        WHEN {row}.stars < 1000 THEN '100-999'
+        WHEN {row}.stars < 10000 THEN '1000-9999'
+        ELSE '10000+' END""",
+}
+
+
+def utc_timestamp(value: str) -> str:
+    """Normalize an ISO 8601 timestamp to the stored UTC ``YYYY-MM-DD HH:MM:SS`` form.
+
+    Timestamps without an offset are taken as UTC. Raises ``ValueError``
+    if ``value`` can't be parsed.
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def rollup_keys_sql(row: str, source: str = '') -> str:
+    """Build the SELECT yielding the rollup keys and stars of ``row``.
+
+    Each row is cross joined with every granularity and dimension, so one
+    statement covers all rollups. ``row`` is ``NEW``/``OLD`` in triggers,
+    or an alias defined by ``source`` (e.g. ``repo_transfers t``).
+    """
+    def cases(column, options):
+        return "CASE {} {} END".format(column, ' '.join(
+            f"WHEN '{name}' THEN {expr}" for name, expr in options.items()))
+
+    granularities = ' UNION ALL '.join(f"SELECT '{name}' AS granularity" for name in ROLLUP_GRANULARITIES)
+    dimensions = ' UNION ALL '.join(f"SELECT '{name}' AS dimension" for name in ROLLUP_DIMENSIONS)
+    event_time = f"COALESCE(datetime({row}.date), {row}.created_at)"
+    bucket = cases('g.granularity', {name: expr.format(ts=event_time)
+                                     for name, expr in ROLLUP_GRANULARITIES.items()})
+    value = cases('d.dimension', {name: expr.format(row=row) for name, expr in ROLLUP_DIMENSIONS.items()})
+    tables = f"{source}, " if source else ""
+    return f"""SELECT g.granularity, d.dimension, {value} AS value, {bucket} AS bucket,
+            COALESCE({row}.stars, 0) AS stars
+        FROM {tables}({granularities}) g, ({dimensions}) d"""
+
+
+ROLLUP_UPSERT_SQL = """
+    INSERT INTO transfer_rollups (granularity, dimension, value, bucket, count, stars_sum)
+    SELECT keys.granularity, keys.dimension, keys.value, keys.bucket, {sign}1, {sign}keys.stars
+    FROM ({keys}) keys
+    WHERE keys.bucket IS NOT NULL
+    ON CONFLICT(granularity, dimension, value, bucket) DO UPDATE SET
+        count = count + excluded.count,
+        stars_sum = stars_sum + excluded.stars_sum;
+"""
+
+# Removes rollup rows left empty by a delete or an update of ``row``
+ROLLUP_PRUNE_SQL = """
+    DELETE FROM transfer_rollups
+    WHERE count <= 0 AND (granularity, dimension, value, bucket) IN (
+        SELECT granularity, dimension, value, bucket FROM ({keys}));
+"""
+
+# Triggers keeping transfer_rollups current as repo_transfers is written
+ROLLUP_TRIGGERS_SQL = f"""
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_rollups_insert
+        AFTER INSERT ON repo_transfers
+        BEGIN
+            {ROLLUP_UPSERT_SQL.format(sign='', row='NEW', keys=rollup_keys_sql('NEW'))}
+        END;
+
+        -- Upserts rewrite stars on every detection; only real changes move buckets
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_rollups_update
+        AFTER UPDATE OF stars, language, new_owner, date, created_at ON repo_transfers
+        WHEN OLD.stars IS NOT NEW.stars OR OLD.language IS NOT NEW.language
+            OR OLD.new_owner IS NOT NEW.new_owner OR OLD.date IS NOT NEW.date
+            OR OLD.created_at IS NOT NEW.created_at
+        BEGIN
+            {ROLLUP_UPSERT_SQL.format(sign='-', row='OLD', keys=rollup_keys_sql('OLD'))}
+            {ROLLUP_UPSERT_SQL.format(sign='', row='NEW', keys=rollup_keys_sql('NEW'))}
+            {ROLLUP_PRUNE_SQL.format(keys=rollup_keys_sql('OLD'))}
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_rollups_delete
+        AFTER DELETE ON repo_transfers
+        BEGIN
+            {ROLLUP_UPSERT_SQL.format(sign='-', row='OLD', keys=rollup_keys_sql('OLD'))}
+            {ROLLUP_PRUNE_SQL.format(keys=rollup_keys_sql('OLD'))}
+        END;
+"""
+
+# Recomputes transfer_rollups from repo_transfers. Used to populate it when
+# it is created and by ``RepoRadarDB.rebuild_stats``.
+REBUILD_ROLLUPS_SQL = f"""
+    DELETE FROM transfer_rollups;
+    INSERT INTO transfer_rollups (granularity, dimension, value, bucket, count, stars_sum)
+    SELECT keys.granularity, keys.dimension, keys.value, keys.bucket, COUNT(*), SUM(keys.stars)
+    FROM ({rollup_keys_sql('t', 'repo_transfers t')}) keys
+    WHERE keys.bucket IS NOT NULL
+    GROUP BY keys.granularity, keys.dimension, keys.value, keys.bucket;
+"""
+
+# Ordered schema migrations applied by ``RepoRadarDB.migrate``. The database's
+# ``PRAGMA user_version`` records the last one applied; append new entries
+# with the next version number and never edit a released one.
+SCHEMA_MIGRATIONS = [
+    (1, "Secondary indexes for feed, stats and top buyers", """
+        CREATE INDEX IF NOT EXISTS idx_repo_transfers_created_at ON repo_transfers(created_at);
+        CREATE INDEX IF NOT EXISTS idx_repo_transfers_new_owner ON repo_transfers(new_owner);
+        CREATE INDEX IF NOT EXISTS idx_repo_transfers_old_owner ON repo_transfers(old_owner);
+        CREATE INDEX IF NOT EXISTS idx_repo_transfers_stars ON repo_transfers(stars);
+        CREATE INDEX IF NOT EXISTS idx_repo_transfers_language ON repo_transfers(language);
+    """),
+    (2, "Materialized statistics maintained by triggers", """
+        CREATE TABLE IF NOT EXISTS owner_stats (
+            owner TEXT PRIMARY KEY,
+            bought INTEGER NOT NULL DEFAULT 0,
+            sold INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_owner_stats_bought ON owner_stats(bought);
+        CREATE TABLE IF NOT EXISTS transfer_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_transfers INTEGER NOT NULL DEFAULT 0,
+            unique_buyers INTEGER NOT NULL DEFAULT 0,
+            unique_sellers INTEGER NOT NULL DEFAULT 0,
+            stars_sum INTEGER NOT NULL DEFAULT 0,
+            stars_count INTEGER NOT NULL DEFAULT 0,
+            max_stars INTEGER
+        );
+        INSERT OR IGNORE INTO transfer_totals (id) VALUES (1);
+
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_stats_insert
+        AFTER INSERT ON repo_transfers
+        BEGIN
+            UPDATE transfer_totals SET
+                total_transfers = total_transfers + 1,
+                unique_buyers = unique_buyers + NOT EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = NEW.new_owner AND bought > 0),
+                unique_sellers = unique_sellers + NOT EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = NEW.old_owner AND sold > 0),
+                stars_sum = stars_sum + COALESCE(NEW.stars, 0),
+                stars_count = stars_count + (NEW.stars IS NOT NULL),
+                max_stars = CASE WHEN max_stars IS NULL OR NEW.stars > max_stars
+                                 THEN COALESCE(NEW.stars, max_stars) ELSE max_stars END
+            WHERE id = 1;
+            INSERT INTO owner_stats (owner, bought) VALUES (NEW.new_owner, 1)
+                ON CONFLICT(owner) DO UPDATE SET bought = bought + 1;
+            INSERT INTO owner_stats (owner, sold) VALUES (NEW.old_owner, 1)
+                ON CONFLICT(owner) DO UPDATE SET sold = sold + 1;
+        END;
+
+        -- Upserts refresh stars; max_stars only ever grows here, rebuild_stats lowers it
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_stats_update
+        AFTER UPDATE OF stars ON repo_transfers
+        BEGIN
+            UPDATE transfer_totals SET
+                stars_sum = stars_sum - COALESCE(OLD.stars, 0) + COALESCE(NEW.stars, 0),
+                stars_count = stars_count - (OLD.stars IS NOT NULL) + (NEW.stars IS NOT NULL),
+                max_stars = CASE WHEN max_stars IS NULL OR NEW.stars > max_stars
+                                 THEN COALESCE(NEW.stars, max_stars) ELSE max_stars END
+            WHERE id = 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_stats_delete
+        AFTER DELETE ON repo_transfers
+        BEGIN
+            UPDATE owner_stats SET bought = bought - 1 WHERE owner = OLD.new_owner;
+            UPDATE owner_stats SET sold = sold - 1 WHERE owner = OLD.old_owner;
+            UPDATE transfer_totals SET
+                total_transfers = total_transfers - 1,
+                unique_buyers = unique_buyers - EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = OLD.new_owner AND bought = 0),
+                unique_sellers = unique_sellers - EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = OLD.old_owner AND sold = 0),
+                stars_sum = stars_sum - COALESCE(OLD.stars, 0),
+                stars_count = stars_count - (OLD.stars IS NOT NULL)
+            WHERE id = 1;
+        END;
+    """ + REBUILD_STATS_SQL),
+    (3, "Write generation counter for response cache invalidation", """
+        CREATE TABLE IF NOT EXISTS data_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO data_generation (id) VALUES (1);
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_generation_insert
+        AFTER INSERT ON repo_transfers
+        BEGIN
+            UPDATE data_generation SET generation = generation + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_generation_update
+        AFTER UPDATE ON repo_transfers
+        BEGIN
+            UPDATE data_generation SET generation = generation + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_generation_delete
+        AFTER DELETE ON repo_transfers
+        BEGIN
+            UPDATE data_generation SET generation = generation + 1 WHERE id = 1;
+        END;
+    """),
+    (4, "Look up repository snapshots by GitHub repository id", """
+        CREATE INDEX IF NOT EXISTS idx_repo_snapshots_repo_id ON repo_snapshots(repo_id);
+    """),
+    (5, "Checkpoints and owner history for GH Archive imports", """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            archive TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            events INTEGER NOT NULL,
+            transfers INTEGER NOT NULL,
+            imported_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE IF NOT EXISTS archive_owners (
+            repo_id INTEGER PRIMARY KEY,
+            repo TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            seen_at TEXT NOT NULL
+        );
+    """),
+    (6, "Current full name of watched repositories for redirect probes", """
+        ALTER TABLE repo_snapshots ADD COLUMN full_name TEXT;
+    """),
+    (7, "Repository id membership of watched organizations", """
+        CREATE TABLE IF NOT EXISTS org_repos (
+            org TEXT NOT NULL,
+            repo_id INTEGER NOT NULL,
+            repo TEXT NOT NULL,
+            PRIMARY KEY (org, repo_id)
+        );
+    """),
+    (8, "Leased work queue for standalone pollers", """
+        CREATE TABLE IF NOT EXISTS work_queue (
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            due_at REAL NOT NULL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            last_polled REAL,
+            PRIMARY KEY (kind, name)
+        );
+        CREATE INDEX IF NOT EXISTS idx_work_queue_due_at ON work_queue(due_at);
+    """),
+    (9, "Persistent outbound queue for Slack alerts", """
+        CREATE TABLE IF NOT EXISTS slack_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            transfer TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            next_attempt REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            last_error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_slack_outbox_next_attempt ON slack_outbox(status, next_attempt);
+    """),
+    (10, "Hourly, daily and weekly transfer rollups maintained by triggers", f"""
+        CREATE TABLE IF NOT EXISTS transfer_rollups (
+            granularity TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            stars_sum INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (granularity, dimension, value, bucket)
+        ) WITHOUT ROWID;
+
+        {ROLLUP_TRIGGERS_SQL}
+    """ + REBUILD_ROLLUPS_SQL),
+    (11, "Bucket transfer rollups by event time instead of insert time", f"""
+        DROP TRIGGER IF EXISTS trg_repo_transfers_rollups_insert;
+        DROP TRIGGER IF EXISTS trg_repo_transfers_rollups_update;
+        DROP TRIGGER IF EXISTS trg_repo_transfers_rollups_delete;
+        {ROLLUP_TRIGGERS_SQL}
+    """ + REBUILD_ROLLUPS_SQL),
+    (12, "Keep owner statistics current when a transfer's owners change", """
+        -- Moves the bought/sold counts like a delete of OLD followed by an insert of NEW
+        CREATE TRIGGER IF NOT EXISTS trg_repo_transfers_stats_owners
+        AFTER UPDATE OF new_owner, old_owner ON repo_transfers
+        WHEN OLD.new_owner IS NOT NEW.new_owner OR OLD.old_owner IS NOT NEW.old_owner
+        BEGIN
+            UPDATE owner_stats SET bought = bought - 1 WHERE owner = OLD.new_owner;
+            UPDATE owner_stats SET sold = sold - 1 WHERE owner = OLD.old_owner;
+            UPDATE transfer_totals SET
+                unique_buyers = unique_buyers - EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = OLD.new_owner AND bought = 0),
+                unique_sellers = unique_sellers - EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = OLD.old_owner AND sold = 0)
+            WHERE id = 1;
+            UPDATE transfer_totals SET
+                unique_buyers = unique_buyers + NOT EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = NEW.new_owner AND bought > 0),
+                unique_sellers = unique_sellers + NOT EXISTS (
+                    SELECT 1 FROM owner_stats WHERE owner = NEW.old_owner AND sold > 0)
+            WHERE id = 1;
+            INSERT INTO owner_stats (owner, bought) VALUES (NEW.new_owner, 1)
+                ON CONFLICT(owner) DO UPDATE SET bought = bought + 1;
+            INSERT INTO owner_stats (owner, sold) VALUES (NEW.old_owner, 1)
+                ON CONFLICT(owner) DO UPDATE SET sold = sold + 1;
+        END;
+    """ + REBUILD_STATS_SQL),
+]
+
+# Queries that must stay index-backed, checked by ``RepoRadarDB.check_query_plans``:
+# name -> (sql, params, index expected in the plan)
+RECENT_TRANSFERS_SQL = "SELECT * FROM repo_transfers ORDER BY created_at DESC LIMIT ?"
+TOP_BUYERS_SQL = """
+    SELECT owner as new_owner, bought as count
+    FROM owner_stats
+    WHERE bought > 0
+    ORDER BY bought DESC
+    LIMIT 10
+"""
+
+# Columns exposed by /export, in output order
+EXPORT_COLUMNS = (
+    'id', 'repo', 'old_owner', 'new_owner', 'date', 'stars', 'language',
+    'created_at', 'first_seen', 'last_seen', 'seen_count'
+)
+
+STATS_SQL = """
+    SELECT
+        total_transfers,
+        unique_buyers,
+        unique_sellers,
+        CASE WHEN stars_count > 0 THEN stars_sum * 1.0 / stars_count END as avg_stars,
+        max_stars
+    FROM transfer_totals
+    WHERE id = 1
+"""
+
+
+def feed_query(before: Optional[int] = None, language: Optional[str] = None,
+               min_stars: Optional[int] = None, buyer: Optional[str] = None,
+               limit: int = 50, by_stars: bool = False) -> Tuple[str, tuple]:
+    """Build the keyset-paginated feed query, newest first.
+
+    Equality filters on ``language``/``new_owner`` are served by their
+    indexes, which SQLite stores together with the rowid, so ``id < ?``
+    and ``ORDER BY id DESC`` need no extra sort. ``by_stars`` serves a
+    ``min_stars`` filter from the stars index instead: the matching rows
+    are sorted, but a selective threshold doesn't scan the whole table to
+    fill one page.
+    """
+    conditions, params = [], []
+    if before is not None:
+        conditions.append("id < ?")
+        params.append(before)
+    if language:
+        conditions.append("language = ?")
+        params.append(language)
+    if buyer:
+        conditions.append("new_owner = ?")
+        params.append(buyer)
+    if min_stars:
+        conditions.append("stars >= ?")
+        params.append(min_stars)
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    indexed = "INDEXED BY idx_repo_transfers_stars " if by_stars and min_stars else ""
+    params.append(limit)
+    return f"SELECT * FROM repo_transfers {indexed}{where}ORDER BY id DESC LIMIT ?", tuple(params)
+
+
+def timeseries_query(granularity: str = 'day', dimension: str = 'all', value: Optional[str] = None,
+                     start: Optional[str] = None, end: Optional[str] = None) -> Tuple[str, tuple]:
+    """Build the rollup query for a time series, oldest bucket first.
+
+    ``start``/``end`` are timestamps rounded down to their bucket, so both
+    ends of the range are inclusive. With a ``value`` the query is a range
+    scan of the primary key; without one every value of the dimension is
+    returned.
+    """
+    conditions, params = ["granularity = ?", "dimension = ?"], [granularity, dimension]
+    if dimension == 'all':
+        value = ''
+    if value is not None:
+        conditions.append("value = ?")
+        params.append(value)
+    bucket = ROLLUP_GRANULARITIES[granularity]
+    if start:
+        conditions.append(f"bucket >= {bucket.format(ts='?')}")
+        params.append(start)
+    if end:
+        conditions.append(f"bucket <= {bucket.format(ts='?')}")
+        params.append(end)
+    return (
+        "SELECT bucket, value, count, stars_sum FROM transfer_rollups "
+        f"WHERE {' AND '.join(conditions)} ORDER BY bucket, value",
+        tuple(params)
+    )
+
+
+HOT_QUERIES = {
+    'recent_transfers': (RECENT_TRANSFERS_SQL, (50,), 'idx_repo_transfers_created_at'),
+    'top_buyers': (TOP_BUYERS_SQL, (), 'idx_owner_stats_bought'),
+    'feed_page': feed_query(before=1000) + ('INTEGER PRIMARY KEY',),
+    'feed_by_buyer': feed_query(before=1000, buyer='google') + ('idx_repo_transfers_new_owner',),
+    'feed_by_language': feed_query(before=1000, language='Python') + ('idx_repo_transfers_language',),
+    'feed_by_min_stars': feed_query(before=1000, min_stars=1000, by_stars=True) + ('idx_repo_transfers_stars',),
+    'transfers_by_seller': (
+        "SELECT * FROM repo_transfers WHERE old_owner = ? ORDER BY id DESC LIMIT ?",
+        ('google', 50), 'idx_repo_transfers_old_owner'
+    ),
+    'top_starred': (
+        "SELECT * FROM repo_transfers ORDER BY stars DESC LIMIT ?",
+        (10,), 'idx_repo_transfers_stars'
+    ),
+    'timeseries': timeseries_query('day', 'language', 'Python', '2025-01-01', '2025-12-31') + ('PRIMARY KEY',),
+}
+
+
+def split_sql(script: str) -> List[str]:
+    """Split a SQL script into statements, keeping trigger bodies whole."""
+    statements, buffer = [], ''
+    for part in script.split(';'):
+        buffer += part + ';'
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip(' \n;'):
+                statements.append(buffer.strip())
+            buffer = ''
+    return statements
+
+
+# A min_stars feed filter matching fewer rows than this is served from the
+# stars index; above it, walking the primary key fills a page sooner
+STARS_INDEX_MAX_MATCHES = 5000
+
+
+def transfer_key(repo: str, old_owner: str, new_owner: str) -> str:
+    """Build the canonical identity of a transfer.
+
+    A transfer is the same event no matter when it was detected, so the
+    detection date is deliberately not part of the key. Must stay in sync
+    with the SQL expression used by ``RepoRadarDB.compact_transfers``.
+    """
+    return f"{repo.lower()}|{old_owner.lower()}|{new_owner.lower()}"
+
 
 class RepoRadarDB:
     """SQLite database manager for RepoRadar."""
 
-    def __init__(self, db_path: str = "reporadar.db"):
-        """Initialize database connection and create tables."""
+    def __init__(self, db_path: str = "reporadar.db", busy_timeout: float = 10.0,
+                 pool_size: int = 8):
+        """Initialize database connection and create tables.
+
+        ``busy_timeout`` is how many seconds a writer waits for another
+        writer's lock before failing with ``database is locked``.
+        ``pool_size`` is how many idle connections are kept for reuse.
+        """
         self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.pool_size = max(1, pool_size)
+        self._idle: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._local = threading.local()
         self.init_database()
 
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection with the standard pragmas."""
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection for one transaction.
+
+        Use as ``with db.connection() as conn:``; the transaction is
+        committed (or rolled back on error) and the connection goes back
+        to the pool, so short-lived threads such as Flask's per-request
+        threads reuse connections instead of opening their own. Connections
+        run in WAL mode, so readers keep reading while the poller writes.
+        Nested use in one thread shares the borrowed connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            with conn:
+                yield conn
+            return
+
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        self._local.conn = conn
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._pool_lock:
+                if len(self._idle) < self.pool_size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """Close the idle pooled connections."""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
     def init_database(self):
         """Create database tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connection() as conn:
+            conn.execute(TRANSFERS_TABLE_SQL.format(table='repo_transfers'))
             conn.execute("""
-                CREATE TABLE IF NOT EXISTS repo_transfers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    repo TEXT NOT NULL,
-                    old_owner TEXT NOT NULL,
-                    new_owner TEXT NOT NULL,
-                    date TEXT NOT NULL,
+                CREATE TABLE IF NOT EXISTS repo_snapshots (
+                    repo TEXT PRIMARY KEY,
+                    repo_id INTEGER,
+                    owner TEXT NOT NULL,
                     stars INTEGER DEFAULT 0,
                     language TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(repo, old_owner, new_owner, date)
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             conn.commit()
-            logger.info("Database initialized successfully")
+            legacy = 'transfer_key' not in self._table_columns(conn, 'repo_transfers')
+
+        if legacy:
+            logger.info("Migrating repo_transfers to keyed transfers")
+            self.compact_transfers()
+        self.migrate()
+        logger.info("Database initialized successfully")
+
+    def migrate(self) -> int:
+        """Apply pending ``SCHEMA_MIGRATIONS`` and return the resulting schema version.
+
+        Each migration runs in its own transaction together with the
+        ``user_version`` bump, so a failed migration leaves the previous
+        version intact and is retried on the next start. The version is
+        re-read under the write lock, so processes starting together (web
+        app and poller workers) apply each migration exactly once.
+        """
+        with self.connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            # Manage the transaction explicitly; executescript() can't be used
+            # because it commits the BEGIN IMMEDIATE before running
+            isolation_level, conn.isolation_level = conn.isolation_level, None
+            try:
+                for target, description, script in SCHEMA_MIGRATIONS:
+                    if target <= version:
+                        continue
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        version = conn.execute("PRAGMA user_version").fetchone()[0]
+                        if target <= version:
+                            conn.execute("ROLLBACK")
+                            continue
+                        logger.info(f"Applying schema migration {target}: {description}")
+                        for statement in split_sql(script):
+                            conn.execute(statement)
+                        conn.execute(f"PRAGMA user_version = {target}")
+                        conn.execute("COMMIT")
+                        version = target
+                    except Exception:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        raise
+            finally:
+                conn.isolation_level = isolation_level
+            return version
+
+    def check_query_plans(self) -> Dict[str, Dict]:
+        """Run ``EXPLAIN QUERY PLAN`` on ``HOT_QUERIES``.
+
+        Returns, per query, the plan lines and whether the expected index
+        shows up in them.
+        """
+        results = {}
+        with self.connection() as conn:
+            for name, (sql, params, index) in HOT_QUERIES.items():
+                plan = [row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                results[name] = {
+                    'index': index,
+                    'uses_index': any(index in line for line in plan),
+                    'plan': plan
+                }
+        return results
+
+    @staticmethod
+    def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+        """Get the column names of a table."""
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    def compact_transfers(self) -> Tuple[int, int]:
+        """Collapse duplicate transfer rows into one row per transfer identity.
+
+        Rebuilds a legacy date-keyed ``repo_transfers`` table keyed by
+        ``transfer_key``: the earliest row of each identity is kept,
+        stars/language come from the latest one, and
+        ``first_seen``/``last_seen``/``seen_count`` summarize the collapsed
+        rows. Tables already on the keyed schema cannot hold duplicates and
+        are left alone (a rebuild would also drop their indexes and
+        triggers). Returns the row counts before and after.
+        """
+        with self.connection() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM repo_transfers").fetchone()[0]
+            if 'transfer_key' in self._table_columns(conn, 'repo_transfers'):
+                logger.info(f"repo_transfers is already keyed ({before} rows), nothing to compact")
+                return before, before
+
+            conn.executescript(f"""
+                BEGIN;
+                DROP TABLE IF EXISTS repo_transfers_compact;
+                {TRANSFERS_TABLE_SQL.format(table='repo_transfers_compact')};
+                INSERT INTO repo_transfers_compact
+                    (id, transfer_key, repo, old_owner, new_owner, date, stars, language,
+                     created_at, first_seen, last_seen, seen_count)
+                SELECT first.id, g.transfer_key, first.repo, first.old_owner, first.new_owner,
+                       first.date, latest.stars, latest.language, first.created_at,
+                       g.first_seen, g.last_seen, g.seen_count
+                FROM (
+                    SELECT lower(repo) || '|' || lower(old_owner) || '|' || lower(new_owner) AS transfer_key,
+                           MIN(id) AS first_id,
+                           MAX(id) AS last_id,
+                           MIN(date) AS first_seen,
+                           MAX(date) AS last_seen,
+                           COUNT(*) AS seen_count
+                    FROM repo_transfers
+                    GROUP BY 1
+                ) AS g
+                JOIN repo_transfers AS first ON first.id = g.first_id
+                JOIN repo_transfers AS latest ON latest.id = g.last_id;
+                DROP TABLE repo_transfers;
+                ALTER TABLE repo_transfers_compact RENAME TO repo_transfers;
+                COMMIT;
+            """)
+
+            after = conn.execute("SELECT COUNT(*) FROM repo_transfers").fetchone()[0]
+
+        logger.info(f"Compacted repo_transfers: {before} rows -> {after} rows")
+        return before, after
 
     def add_transfer(self, repo: str, old_owner: str, new_owner: str, 
                     date: str, stars: int = 0, language: str = None) -> bool:
-        """Add a repository transfer to the database."""
+        """Add a repository transfer to the database.
+
+        A transfer that is already recorded (same ``transfer_key``) is not
+        duplicated; its ``last_seen``, ``seen_count`` and stars are updated.
+        """
+        statuses = self.add_transfers([{
+            'repo': repo,
+            'old_owner': old_owner,
+            'new_owner': new_owner,
+            'date': date,
+            'stars': stars,
+            'language': language
+        }])
+        return statuses[0] != 'error'
+
+    def add_transfers(self, transfers: Iterable[Dict]) -> List[str]:
+        """Add many repository transfers in a single transaction.
+
+        Each transfer is a dict with ``repo``, ``old_owner``, ``new_owner``,
+        ``date`` and optionally ``stars``/``language``. Returns one status per
+        input row, in order: ``inserted`` for a new transfer, ``ignored`` for
+        one already recorded (only its ``last_seen``/``seen_count``/stars are
+        refreshed), or ``error`` for every row if the batch failed.
+        """
+        rows = []
+        for t in transfers:
+            date = t['date']
+            rows.append((
+                transfer_key(t['repo'], t['old_owner'], t['new_owner']),
+                t['repo'], t['old_owner'], t['new_owner'], date,
+                t.get('stars', 0), t.get('language'), date, date
+            ))
+        if not rows:
+            return []
+
+        try:
+            with self.connection() as conn:
+                # Take the write lock up front so the existing-key lookup stays valid
+                conn.execute("BEGIN IMMEDIATE")
+                known = set()
+                keys = list({row[0] for row in rows})
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor = conn.execute(
+                        f"SELECT transfer_key FROM repo_transfers WHERE transfer_key IN ({placeholders})",
+                        chunk
+                    )
+                    known.update(row[0] for row in cursor)
+
+                statuses = []
+                for row in rows:
+                    if row[0] in known:
+                        statuses.append('ignored')
+                    else:
+                        statuses.append('inserted')
+                        known.add(row[0])
+                        logger.info(f"Added transfer: {row[1]} from {row[2]} to {row[3]}")
+
+                conn.executemany(
+                    """INSERT INTO repo_transfers
+                       (transfer_key, repo, old_owner, new_owner, date, stars, language,
+                        first_seen, last_seen)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(transfer_key) DO UPDATE SET
+                           last_seen = MAX(last_seen, excluded.last_seen),
+                           seen_count = seen_count + 1,
+                           stars = excluded.stars,
+                           language = COALESCE(excluded.language, language)""",
+                    rows
+                )
+            return statuses
+        except Exception as e:
+            logger.error(f"Error adding transfers: {e}")
+            return ['error'] * len(rows)
+
+    def get_snapshot(self, repo: str) -> Optional[Dict]:
+        """Get the last known owner/stars/language snapshot of a repository."""
+        return self.get_snapshots([repo]).get(repo)
+
+    def get_snapshots(self, repos: List[str]) -> Dict[str, Dict]:
+        """Get last known snapshots for many repositories, keyed by repo name."""
+        snapshots = {}
+        try:
+            with self.connection() as conn:
+                # Stay well below SQLite's host parameter limit
+                for start in range(0, len(repos), 500):
+                    chunk = repos[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor = conn.execute(
+                        f"SELECT * FROM repo_snapshots WHERE repo IN ({placeholders})",
+                        chunk
+                    )
+                    for row in cursor:
+                        snapshots[row['repo']] = dict(row)
+        except Exception as e:
+            logger.error(f"Error getting snapshots: {e}")
+        return snapshots
+
+    def get_snapshots_by_id(self, repo_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Get snapshots of repositories by GitHub repository id."""
+        repo_ids = list({repo_id for repo_id in repo_ids if repo_id is not None})
+        snapshots = {}
+        try:
+            with self.connection() as conn:
+                for start in range(0, len(repo_ids), 500):
+                    chunk = repo_ids[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor = conn.execute(
+                        f"SELECT * FROM repo_snapshots WHERE repo_id IN ({placeholders})",
+                        chunk
+                    )
+                    for row in cursor:
+                        snapshots[row['repo_id']] = dict(row)
+        except Exception as e:
+            logger.error(f"Error getting snapshots by id: {e}")
+        return snapshots
+
+    def get_snapshot_ids(self) -> List[int]:
+        """Get the GitHub repository ids of every watched repository."""
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute("SELECT repo_id FROM repo_snapshots WHERE repo_id IS NOT NULL")
+                return [row[0] for row in cursor]
+        except Exception as e:
+            logger.error(f"Error getting snapshot ids: {e}")
+            return []
+
+    def save_snapshots(self, snapshots: List[Dict]) -> bool:
+        """Insert or update repository snapshots in a single transaction."""
+        if not snapshots:
+            return True
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    """INSERT INTO repo_snapshots (repo, repo_id, owner, full_name, stars, language, updated_at)
+                       VALUES (:repo, :repo_id, :owner, :full_name, :stars, :language, CURRENT_TIMESTAMP)
+                       ON CONFLICT(repo) DO UPDATE SET
+                           repo_id = excluded.repo_id,
+                           owner = excluded.owner,
+                           full_name = COALESCE(excluded.full_name, full_name),
+                           stars = excluded.stars,
+                           language = excluded.language,
+                           updated_at = excluded.updated_at""",
+                    [dict({'full_name': None}, **snapshot) for snapshot in snapshots]
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error saving snapshots: {e}")
+            return False
+
+    def save_detections(self, transfers: List[Dict], snapshots: List[Dict]) -> List[str]:
+        """Store detected transfers, then the snapshots that don't hide a failed one.
+
+        Returns the ``add_transfers`` status of each transfer. A transfer
+        that couldn't be written keeps its repository's old snapshot, so the
+        next check detects it again instead of taking the new owner as the
+        baseline.
+        """
+        statuses = self.add_transfers(transfers) if transfers else []
+        failed = {transfer['repo'] for transfer, status in zip(transfers, statuses) if status == 'error'}
+        if failed:
+            logger.error(f"Keeping old snapshots of {len(failed)} repositories whose transfers weren't stored")
+        self.save_snapshots([snapshot for snapshot in snapshots if snapshot['repo'] not in failed])
+        return statuses
+
+    def get_org_repos(self, org: str) -> Dict[int, str]:
+        """Get the last recorded members of an organization, repository id to name."""
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute("SELECT repo_id, repo FROM org_repos WHERE org = ?", (org,))
+                return {row['repo_id']: row['repo'] for row in cursor}
+        except Exception as e:
+            logger.error(f"Error getting repositories of org {org}: {e}")
+            return {}
+
+    def save_org_repos(self, org: str, repos: Dict[int, str]) -> bool:
+        """Replace the recorded members of an organization in a single transaction."""
+        try:
+            with self.connection() as conn:
+                conn.execute("DELETE FROM org_repos WHERE org = ?", (org,))
+                conn.executemany(
+                    "INSERT INTO org_repos (org, repo_id, repo) VALUES (?, ?, ?)",
+                    [(org, repo_id, repo) for repo_id, repo in repos.items()]
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error saving repositories of org {org}: {e}")
+            return False
+
+    def sync_work_queue(self, items: List[Dict]) -> Tuple[int, int]:
+        """Make the work queue hold exactly ``items``, keeping existing schedules.
+
+        Each item is a dict with ``kind``, ``name``, ``tier`` and ``due_at``;
+        the last two are only used for items not queued yet. Returns the
+        number of items added and removed.
+        """
+        try:
+            with self.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                existing = {(row['kind'], row['name'])
+                            for row in conn.execute("SELECT kind, name FROM work_queue")}
+                wanted = {(item['kind'], item['name']) for item in items}
+                conn.executemany(
+                    """INSERT OR IGNORE INTO work_queue (kind, name, tier, due_at)
+                       VALUES (:kind, :name, :tier, :due_at)""",
+                    items
+                )
+                removed = existing - wanted
+                conn.executemany("DELETE FROM work_queue WHERE kind = ? AND name = ?", removed)
+            return len(wanted - existing), len(removed)
+        except Exception as e:
+            logger.error(f"Error syncing work queue: {e}")
+            return 0, 0
+
+    def lease_work(self, worker: str, limit: int, lease_seconds: float) -> List[Dict]:
+        """Lease up to ``limit`` due items to ``worker``, oldest due first.
+
+        Items whose lease expired (their worker died or stalled) are
+        leased again. Selecting and leasing happen under one write lock,
+        so concurrent workers never receive the same item.
+        """
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = [dict(row) for row in conn.execute(
+                    """SELECT * FROM work_queue
+                       WHERE due_at <= ? AND (lease_owner IS NULL OR lease_expires < ?)
+                       ORDER BY due_at LIMIT ?""",
+                    (now, now, limit)
+                )]
+                conn.executemany(
+                    """UPDATE work_queue SET lease_owner = ?, lease_expires = ?
+                       WHERE kind = ? AND name = ?""",
+                    [(worker, now + lease_seconds, row['kind'], row['name']) for row in rows]
+                )
+            for row in rows:
+                if row['lease_owner']:
+                    logger.warning(f"Reclaimed expired lease on {row['kind']} {row['name']} "
+                                   f"from {row['lease_owner']}")
+            return rows
+        except Exception as e:
+            logger.error(f"Error leasing work: {e}")
+            return []
+
+    def heartbeat_work(self, worker: str, lease_seconds: float) -> int:
+        """Extend every lease held by ``worker``; returns how many were extended."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
+                cursor = conn.execute(
+                    "UPDATE work_queue SET lease_expires = ? WHERE lease_owner = ?",
+                    (time.time() + lease_seconds, worker)
+                )
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error extending leases: {e}")
+            return 0
+
+    def complete_work(self, worker: str, items: List[Dict]) -> bool:
+        """Release items leased by ``worker`` with their next ``due_at`` and ``tier``.
+
+        Items whose lease was meanwhile taken over by another worker are
+        left alone.
+        """
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    """UPDATE work_queue
+                       SET tier = ?, due_at = ?, last_polled = ?, lease_owner = NULL, lease_expires = NULL
+                       WHERE kind = ? AND name = ? AND lease_owner = ?""",
+                    [(item['tier'], item['due_at'], now, item['kind'], item['name'], worker)
+                     for item in items]
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error completing work: {e}")
+            return False
+
+    def get_work_queue_stats(self) -> Dict:
+        """Get queue size, leases, overdue items and the oldest overdue lag."""
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                row = conn.execute(
+                    """SELECT COUNT(*) AS queued,
+                              COUNT(CASE WHEN lease_expires >= ? THEN 1 END) AS leased,
+                              COUNT(CASE WHEN lease_owner IS NOT NULL AND lease_expires < ? THEN 1 END) AS expired,
+                              COUNT(CASE WHEN due_at <= ? THEN 1 END) AS overdue,
+                              MIN(due_at) AS next_due,
+                              COUNT(DISTINCT CASE WHEN lease_expires >= ? THEN lease_owner END) AS workers
+                       FROM work_queue""",
+                    (now, now, now, now)
+                ).fetchone()
+                stats = dict(row)
+                next_due = stats.pop('next_due')
+                stats['lag_seconds'] = round(max(0.0, now - next_due), 1) if next_due else 0.0
+                return stats
+        except Exception as e:
+            logger.error(f"Error getting work queue stats: {e}")
+            return {}
+
+    def enqueue_alerts(self, transfers: List[Dict]) -> int:
+        """Queue transfers for Slack delivery; returns how many were queued."""
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    "INSERT INTO slack_outbox (transfer, created_at, next_attempt) VALUES (?, ?, ?)",
+                    [(json.dumps(transfer), now, now) for transfer in transfers]
+                )
+                conn.commit()
+                return len(transfers)
+        except Exception as e:
+            logger.error(f"Error queueing alerts: {e}")
+            return 0
+
+    def claim_alerts(self, limit: int, claim_seconds: float, settle_seconds: float = 0) -> List[Dict]:
+        """Claim up to ``limit`` pending alerts that are ready to be sent.
+
+        Nothing is claimed until the oldest ready alert has waited
+        ``settle_seconds``, so alerts arriving close together go out in one
+        message. Claimed alerts are hidden from other senders for
+        ``claim_seconds``; if the sender dies they become ready again.
+        """
+        now = time.time()
+        try:
+            with self.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    """SELECT id, transfer, created_at, attempts FROM slack_outbox
+                       WHERE status = 'pending' AND next_attempt <= ?
+                       ORDER BY id LIMIT ?""",
+                    (now, limit)
+                ).fetchall()
+                if not rows or min(row['created_at'] for row in rows) > now - settle_seconds:
+                    return []
+                conn.executemany(
+                    "UPDATE slack_outbox SET next_attempt = ? WHERE id = ?",
+                    [(now + claim_seconds, row['id']) for row in rows]
+                )
+            return [dict(row, transfer=json.loads(row['transfer'])) for row in rows]
+        except Exception as e:
+            logger.error(f"Error claiming alerts: {e}")
+            return []
+
+    def next_alert_due(self) -> Optional[float]:
+        """Earliest time a pending alert becomes ready, or None if the outbox is empty."""
+        try:
+            with self.connection() as conn:
+                row = conn.execute(
+                    "SELECT MIN(next_attempt) FROM slack_outbox WHERE status = 'pending'"
+                ).fetchone()
+                return row[0]
+        except Exception as e:
+            logger.error(f"Error reading outbox: {e}")
+            return None
+
+    def delete_alerts(self, ids: List[int]) -> bool:
+        """Remove delivered alerts from the outbox."""
+        try:
+            with self.connection() as conn:
+                conn.executemany("DELETE FROM slack_outbox WHERE id = ?", [(alert_id,) for alert_id in ids])
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error deleting alerts: {e}")
+            return False
+
+    def defer_alerts(self, ids: List[int], delay: float, error: str, max_attempts: int) -> bool:
+        """Record a failed delivery and retry after ``delay``.
+
+        Alerts that reached ``max_attempts`` are marked ``failed`` and kept
+        in the outbox for inspection instead of being retried.
+        """
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    """UPDATE slack_outbox
+                       SET attempts = attempts + 1, next_attempt = ?, last_error = ?,
+                           status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END
+                       WHERE id = ?""",
+                    [(time.time() + delay, error, max_attempts, alert_id) for alert_id in ids]
+                )
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error deferring alerts: {e}")
+            return False
+
+    def get_outbox_stats(self) -> Dict:
+        """Count queued alerts by status."""
+        try:
+            with self.connection() as conn:
+                rows = conn.execute("SELECT status, COUNT(*) FROM slack_outbox GROUP BY status").fetchall()
+                return {'pending': 0, 'failed': 0, **{row[0]: row[1] for row in rows}}
+        except Exception as e:
+            logger.error(f"Error getting outbox stats: {e}")
+            return {}
+
+    def get_import_checkpoints(self) -> Dict[str, int]:
+        """Get the archives already imported, mapped to their size in bytes."""
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute("SELECT archive, size FROM import_checkpoints")
+                return {row['archive']: row['size'] for row in cursor}
+        except Exception as e:
+            logger.error(f"Error getting import checkpoints: {e}")
+            return {}
+
+    def save_import_checkpoint(self, archive: str, size: int, events: int,
+                               transfers: int, owners: Optional[List[Dict]] = None) -> bool:
+        """Mark an archive as imported, together with the owner history it advanced."""
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    """INSERT OR REPLACE INTO archive_owners (repo_id, repo, owner, seen_at)
+                       VALUES (:repo_id, :repo, :owner, :seen_at)""",
+                    owners or []
+                )
                 conn.execute(
-                    """INSERT OR IGNORE INTO repo_transfers 
-                       (repo, old_owner, new_owner, date, stars, language)
-                       VALUES (?, ?, ?, ?, ?, ?)""",
-                    (repo, old_owner, new_owner, date, stars, language)
+                    """INSERT OR REPLACE INTO import_checkpoints (archive, size, events, transfers)
+                       VALUES (?, ?, ?, ?)""",
+                    (archive, size, events, transfers)
                 )
                 conn.commit()
-                logger.info(f"Added transfer: {repo} from {old_owner} to {new_owner}")
                 return True
         except Exception as e:
-            logger.error(f"Error adding transfer: {e}")
+            logger.error(f"Error saving import checkpoint: {e}")
             return False
 
+    def get_archive_owners(self) -> Dict[int, Dict]:
+        """Get the last owner seen in the archive for each watched repository id."""
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute("SELECT * FROM archive_owners")
+                return {row['repo_id']: dict(row) for row in cursor}
+        except Exception as e:
+            logger.error(f"Error getting archive owners: {e}")
+            return {}
+
     def get_transfers(self, limit: int = 100) -> List[Dict]:
         """Get recent repository transfers."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute(
-                    """SELECT * FROM repo_transfers 
-                       ORDER BY created_at DESC LIMIT ?""",
-                    (limit,)
-                )
+            with self.connection() as conn:
+                cursor = conn.execute(RECENT_TRANSFERS_SQL, (limit,))
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error getting transfers: {e}")
             return []
 
+    def get_transfers_page(self, before: Optional[int] = None, language: Optional[str] = None,
+                           min_stars: Optional[int] = None, buyer: Optional[str] = None,
+                           limit: int = 50) -> List[Dict]:
+        """Get one feed page of transfers, newest first.
+
+        ``before`` is the keyset cursor: pass the smallest ``id`` of the
+        previous page to get the next older one. A ``min_stars`` filter
+        without ``language``/``buyer`` uses the stars index when a bounded
+        count on that index shows the threshold is selective.
+        """
+        try:
+            with self.connection() as conn:
+                by_stars = False
+                if min_stars and not (language or buyer):
+                    matches = conn.execute(
+                        "SELECT COUNT(*) FROM (SELECT 1 FROM repo_transfers WHERE stars >= ? LIMIT ?)",
+                        (min_stars, STARS_INDEX_MAX_MATCHES)
+                    ).fetchone()[0]
+                    by_stars = matches < STARS_INDEX_MAX_MATCHES
+                sql, params = feed_query(before, language, min_stars, buyer, limit, by_stars)
+                cursor = conn.execute(sql, params)
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting transfers page: {e}")
+            return []
+
+    def iter_transfers(self, after: int = 0, since: Optional[str] = None,
+                       limit: Optional[int] = None, batch_size: int = 500) -> Iterator[Dict]:
+        """Iterate over transfers in ``id`` order using keyset pagination.
+
+        Rows are fetched ``batch_size`` at a time (``WHERE id > last_id``),
+        so memory stays flat however large the table is and no read
+        transaction is held between batches. ``after`` resumes from a
+        previously seen id, ``since`` keeps rows stored at or after an ISO
+        8601 timestamp (``created_at``, compared in UTC; raises ``ValueError``
+        if it can't be parsed), ``limit`` caps the number of rows.
+        """
+        columns = ', '.join(EXPORT_COLUMNS)
+        conditions = "id > ?"
+        since_params = ()
+        if since:
+            since = utc_timestamp(since)
+            conditions += " AND created_at >= ?"
+            since_params = (since,)
+
+        remaining = limit
+        with self.connection() as conn:
+            if since:
+                # Jump straight to the first matching id via the created_at index
+                row = conn.execute(
+                    "SELECT MIN(id) FROM repo_transfers WHERE created_at >= ?", since_params
+                ).fetchone()
+                if row[0] is None:
+                    return
+                after = max(after, row[0] - 1)
+
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            with self.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT {columns} FROM repo_transfers WHERE {conditions} ORDER BY id LIMIT ?",
+                    (after,) + since_params + (size,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            after = rows[-1]['id']
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+
     def get_stats(self) -> Dict:
-        """Get transfer statistics."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute("""
-                    SELECT 
-                        COUNT(*) as total_transfers,
-                        COUNT(DISTINCT new_owner) as unique_buyers,
-                        COUNT(DISTINCT old_owner) as unique_sellers,
-                        AVG(stars) as avg_stars,
-                        MAX(stars) as max_stars
-                    FROM repo_transfers
-                """)
+        """Get transfer statistics.
+
+        Reads the trigger-maintained ``transfer_totals`` and ``owner_stats``
+        tables, so the cost doesn't grow with the number of transfers.
+        """
+        try:
+            with self.connection() as conn:
+                cursor = conn.execute(STATS_SQL)
                 stats = dict(cursor.fetchone())
                 
                 # Get top buyers
-                cursor = conn.execute("""
-                    SELECT new_owner, COUNT(*) as count
-                    FROM repo_transfers 
-                    GROUP BY new_owner 
-                    ORDER BY count DESC 
-                    LIMIT 10
-                """)
+                cursor = conn.execute(TOP_BUYERS_SQL)
                 stats['top_buyers'] = [dict(row) for row in cursor.fetchall()]
                 
                 return stats
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+    def get_generation(self) -> Optional[int]:
+        """Get the write generation of ``repo_transfers``.
+
+        The counter is bumped by triggers on every insert, update and
+        delete, in any process, so readers can tell whether data they
+        derived earlier is still current.
+        """
+        try:
+            with self.connection() as conn:
+                row = conn.execute("SELECT generation FROM data_generation WHERE id = 1").fetchone()
+                return row['generation'] if row else 0
+        except Exception as e:
+            logger.error(f"Error getting data generation: {e}")
+            return None
+
+    def get_timeseries(self, granularity: str = 'day', dimension: str = 'all',
+                       value: Optional[str] = None, start: Optional[str] = None,
+                       end: Optional[str] = None) -> List[Dict]:
+        """Get transfer counts and star sums per time bucket.
+
+        Reads the trigger-maintained ``transfer_rollups`` table, so the
+        cost grows with the number of buckets, not of transfers. Buckets
+        without transfers are omitted.
+        """
+        try:
+            sql, params = timeseries_query(granularity, dimension, value, start, end)
+            with self.connection() as conn:
+                return [dict(row) for row in conn.execute(sql, params)]
+        except Exception as e:
+            logger.error(f"Error getting time series: {e}")
+            return []
+
+    def rebuild_stats(self) -> Dict[str, Tuple]:
+        """Recompute the materialized statistics and rollups from ``repo_transfers``.
+
+        Returns the fields whose materialized value disagreed with the
+        recomputed one as ``{field: (before, after)}``; an empty dict means
+        the incremental maintenance was consistent. For ``transfer_rollups``
+        the pair counts the stale rows replaced and the rebuilt rows
+        replacing them.
+        """
+        before = self.get_stats()
+        with self.connection() as conn:
+            conn.executescript(
+                "BEGIN;\n"
+                "DROP TABLE IF EXISTS temp.rollups_before;\n"
+                "CREATE TEMP TABLE rollups_before AS SELECT * FROM transfer_rollups;\n"
+                f"{REBUILD_STATS_SQL}\n{REBUILD_ROLLUPS_SQL}\nCOMMIT;"
+            )
+            stale, rebuilt = conn.execute("""
+                SELECT (SELECT COUNT(*) FROM (SELECT * FROM temp.rollups_before
+                                              EXCEPT SELECT * FROM transfer_rollups)),
+                       (SELECT COUNT(*) FROM (SELECT * FROM transfer_rollups
+                                              EXCEPT SELECT * FROM temp.rollups_before))
+            """).fetchone()
+            conn.execute("DROP TABLE temp.rollups_before")
+        after = self.get_stats()
+
+        drift = {}
+        for field in after:
+            if field == 'top_buyers':
+                # Ties can come back in any order
+                old = sorted((b['new_owner'], b['count']) for b in before.get(field, []))
+                new = sorted((b['new_owner'], b['count']) for b in after[field])
+            else:
+                old, new = before.get(field), after[field]
+            if old != new:
+                drift[field] = (before.get(field), after[field])
+        if stale or rebuilt:
+            drift['transfer_rollups'] = (stale, rebuilt)
+        if drift:
+            logger.warning(f"Materialized stats drifted, rebuilt: {sorted(drift)}")
+        return drift
+
+def main():
+    """Command line maintenance tasks for the RepoRadar database."""
+    parser = argparse.ArgumentParser(description="RepoRadar database maintenance")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'reporadar.db'),
+                        help="Path to the SQLite database (default: $DATABASE_PATH or reporadar.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('compact', help="Collapse duplicate transfer rows")
+    subparsers.add_parser('explain', help="Check that hot queries use their indexes")
+    subparsers.add_parser('rebuild-stats', help="Recompute materialized statistics and report drift")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    db = RepoRadarDB(args.db)
+
+    if args.command == 'compact':
+        before, after = db.compact_transfers()
+        print(f"repo_transfers: {before} rows -> {after} rows ({before - after} duplicates removed)")
+    elif args.command == 'explain':
+        failures = 0
+        for name, result in db.check_query_plans().items():
+            status = 'ok' if result['uses_index'] else 'MISSING INDEX'
+            print(f"{name}: {status} ({result['index']})")
+            for line in result['plan']:
+                print(f"    {line}")
+            failures += not result['uses_index']
+        if failures:
+            raise SystemExit(1)
+    elif args.command == 'rebuild-stats':
+        drift = db.rebuild_stats()
+        if not drift:
+            print("Materialized statistics were consistent")
+        for field, (before, after) in drift.items():
+            print(f"{field}: {before} -> {after}")
+
+
+if __name__ == '__main__':
+    main()
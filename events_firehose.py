@@ -0,0 +1,232 @@
+"""Global public events ingester for RepoRadar."""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from database import RepoRadarDB
+
+logger = logging.getLogger(__name__)
+
+# Event types that can describe a repository changing hands
+TRANSFER_EVENT_TYPES = ('TransferEvent', 'RepositoryEvent')
+
+# GitHub serves at most this many pages of the public timeline
+MAX_EVENT_PAGES = 3
+
+
+def _owner_from_change(changes: Dict) -> Optional[str]:
+    """Read the previous owner from a ``changes.owner.from`` object."""
+    previous = ((changes or {}).get('owner') or {}).get('from') or {}
+    for kind in ('user', 'organization'):
+        login = (previous.get(kind) or {}).get('login')
+        if login:
+            return login
+    return previous.get('login')
+
+
+def transfer_from_event(event: Dict) -> Optional[Dict]:
+    """Extract a transfer from an explicit transfer event.
+
+    Handles ``TransferEvent`` and ``RepositoryEvent`` with action
+    ``transferred``; the previous owner comes from ``payload.changes``.
+    Returns a transfer dict in the shape ``RepoRadarDB.add_transfers``
+    takes, or None if the event isn't a usable transfer.
+    """
+    if event.get('type') not in TRANSFER_EVENT_TYPES:
+        return None
+    payload = event.get('payload') or {}
+    if event['type'] == 'RepositoryEvent' and payload.get('action') != 'transferred':
+        return None
+
+    repository = payload.get('repository') or {}
+    repo = repository.get('full_name') or (event.get('repo') or {}).get('name')
+    if not repo or '/' not in repo:
+        return None
+
+    new_owner = (repository.get('owner') or {}).get('login') or repo.split('/')[0]
+    old_owner = _owner_from_change(payload.get('changes'))
+    if not old_owner or old_owner.lower() == new_owner.lower():
+        return None
+
+    return {
+        'repo': repo,
+        'old_owner': old_owner,
+        'new_owner': new_owner,
+        'date': event.get('created_at'),
+        'stars': repository.get('stargazers_count', 0) or 0,
+        'language': repository.get('language')
+    }
+
+
+class EventsFirehose:
+    """Follow GitHub's global ``/events`` timeline and record transfers.
+
+    One poll fetches a constant number of pages regardless of how many
+    repositories are watched. Pages are requested with ``If-None-Match``
+    and the ``X-Poll-Interval`` header sets the pause between polls.
+    Events are deduplicated by id through a bounded seen-set. Transfers
+    are found from explicit transfer events for any repository, and from
+    watched repositories (those with a snapshot) showing up under a new
+    owner.
+    """
+
+    def __init__(self, tracker, db: RepoRadarDB, pages: int = MAX_EVENT_PAGES,
+                 seen_size: int = 10000, min_poll_interval: int = 60):
+        """Initialize the ingester with a ``GitHubTracker`` for paced requests."""
+        self.tracker = tracker
+        self.db = db
+        self.pages = max(1, min(pages, MAX_EVENT_PAGES))
+        self.seen_size = seen_size
+        self.poll_interval = min_poll_interval
+        self.min_poll_interval = min_poll_interval
+        self._etags = {}
+        self._seen = OrderedDict()
+        self.stats = {'polls': 0, 'requests': 0, 'not_modified': 0, 'events': 0,
+                      'duplicates': 0, 'transfers': 0}
+
+    def fetch_page(self, page: int) -> Optional[List[Dict]]:
+        """Fetch one page of the public timeline.
+
+        Returns None when the page is unchanged (304) or the request failed.
+        """
+        url = f"{self.tracker.api_url}/events?per_page=100&page={page}"
+        headers = {}
+        if url in self._etags:
+            headers['If-None-Match'] = self._etags[url]
+
+        response = self.tracker.send('GET', url, headers=headers)
+        self.stats['requests'] += 1
+        if response is None:
+            return None
+
+        poll_interval = response.headers.get('X-Poll-Interval')
+        if poll_interval:
+            self.poll_interval = max(self.min_poll_interval, int(poll_interval))
+
+        if response.status_code == 304:
+            self.stats['not_modified'] += 1
+            return None
+        if response.status_code != 200:
+            logger.error(f"Events request failed: {response.status_code} - {response.text}")
+            return None
+
+        if response.headers.get('ETag'):
+            self._etags[url] = response.headers['ETag']
+        return response.json()
+
+    def _mark_seen(self, event_id: str) -> bool:
+        """Remember an event id; returns False if it was already seen."""
+        if event_id in self._seen:
+            self._seen.move_to_end(event_id)
+            return False
+        self._seen[event_id] = True
+        if len(self._seen) > self.seen_size:
+            self._seen.popitem(last=False)
+        return True
+
+    def process_events(self, events: Iterable[Dict]) -> List[Dict]:
+        """Deduplicate events, detect transfers and store them in one batch."""
+        fresh = []
+        for event in events:
+            self.stats['events'] += 1
+            if not self._mark_seen(str(event.get('id'))):
+                self.stats['duplicates'] += 1
+                continue
+            fresh.append(event)
+
+        transfers = []
+        implicit = []
+        for event in fresh:
+            transfer = transfer_from_event(event)
+            if transfer:
+                transfers.append(transfer)
+            elif (event.get('repo') or {}).get('id') is not None:
+                implicit.append(event)
+
+        # Watched repositories appearing under a different owner than their snapshot
+        snapshots = self.db.get_snapshots_by_id(event['repo']['id'] for event in implicit)
+        changed_snapshots = {}
+        for event in implicit:
+            snapshot = changed_snapshots.get(event['repo']['id']) or snapshots.get(event['repo']['id'])
+            name = event['repo'].get('name') or ''
+            if not snapshot or '/' not in name:
+                continue
+            new_owner = name.split('/')[0]
+            if new_owner.lower() == snapshot['owner'].lower():
+                continue
+            transfers.append({
+                'repo': snapshot['repo'],
+                'old_owner': snapshot['owner'],
+                'new_owner': new_owner,
+                'date': event.get('created_at'),
+                'stars': snapshot.get('stars', 0),
+                'language': snapshot.get('language')
+            })
+            changed_snapshots[event['repo']['id']] = dict(snapshot, owner=new_owner, full_name=name)
+
+        statuses = self.db.save_detections(transfers, list(changed_snapshots.values()))
+        if 'error' in statuses:
+            # Forget these events and the page ETags so the next poll refetches and retries them
+            for event in fresh:
+                self._seen.pop(str(event.get('id')), None)
+            self._etags.clear()
+        stored = [transfer for transfer, status in zip(transfers, statuses) if status != 'error']
+        self.stats['transfers'] += len(stored)
+        return stored
+
+    def poll_once(self) -> List[Dict]:
+        """Fetch the timeline pages and return transfers detected in new events."""
+        self.stats['polls'] += 1
+        events = []
+        for page in range(1, self.pages + 1):
+            page_events = self.fetch_page(page)
+            if not page_events:
+                break
+            events.extend(page_events)
+        return self.process_events(events)
+
+    def ingest_fixture(self, paths: Iterable[str]) -> List[Dict]:
+        """Process recorded timeline pages (JSON arrays of events) from disk."""
+        transfers = []
+        for path in paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                transfers.extend(self.process_events(json.load(f)))
+        return transfers
+
+    def run(self, on_transfers: Optional[Callable[[List[Dict]], None]] = None,
+            stop_event: Optional[threading.Event] = None):
+        """Poll until ``stop_event`` is set, honoring ``X-Poll-Interval``."""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                transfers = self.poll_once()
+                if transfers:
+                    logger.info(f"Firehose detected {len(transfers)} transfers")
+                    if on_transfers:
+                        on_transfers(transfers)
+            except Exception as e:
+                logger.error(f"Error during firehose poll: {e}")
+            stop_event.wait(self.poll_interval)
+
+
+def main():
+    """Replay recorded ``/events`` pages into the database."""
+    parser = argparse.ArgumentParser(description="Replay recorded GitHub event pages into RepoRadar")
+    parser.add_argument('fixtures', nargs='+', help="JSON files, each holding one page of events")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'reporadar.db'),
+                        help="Path to the SQLite database (default: $DATABASE_PATH or reporadar.db)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    firehose = EventsFirehose(tracker=None, db=RepoRadarDB(args.db))
+    transfers = firehose.ingest_fixture(args.fixtures)
+    print(f"Processed {firehose.stats['events']} events, found {len(transfers)} transfers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Streaming serializers for the /export endpoint."""
+
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator
+
+from database import EXPORT_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow export is optional
+    pa = None
+    pq = None
+
+# Rows serialized per yielded chunk; keeps chunks reasonably sized without buffering the table
+ROWS_PER_CHUNK = 500
+
+# format -> (mimetype, download file extension or None)
+EXPORT_FORMATS = {
+    'json': ('application/json', None),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrow'),
+}
+
+
+def _chunked(rows: Iterable[Dict], size: int = ROWS_PER_CHUNK) -> Iterator[list]:
+    """Group rows into lists of ``size``."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def json_stream(rows: Iterable[Dict], timestamp: str) -> Iterator[str]:
+    """Stream the classic ``{"status", "data", "timestamp"}`` envelope."""
+    yield '{"status": "success", "data": ['
+    first = True
+    for chunk in _chunked(rows):
+        body = ', '.join(json.dumps(row) for row in chunk)
+        yield body if first else ', ' + body
+        first = False
+    yield f'], "timestamp": {json.dumps(timestamp)}}}'
+
+
+def ndjson_stream(rows: Iterable[Dict]) -> Iterator[str]:
+    """Stream one JSON object per line."""
+    for chunk in _chunked(rows):
+        yield ''.join(json.dumps(row) + '\n' for row in chunk)
+
+
+def csv_stream(rows: Iterable[Dict]) -> Iterator[str]:
+    """Stream CSV with a header row."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for chunk in _chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _StreamSink:
+    """Write-only file object that hands written bytes back to a generator.
+
+    pyarrow asks the sink for its position to record offsets in the
+    Parquet footer, so ``tell`` reports the total written, not the size
+    of the pending buffer.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema():
+    """Arrow schema of exported transfers."""
+    integer_columns = {'id', 'stars', 'seen_count'}
+    return pa.schema([
+        (name, pa.int64() if name in integer_columns else pa.string())
+        for name in EXPORT_COLUMNS
+    ])
+
+
+def arrow_stream(rows: Iterable[Dict], fmt: str = 'parquet') -> Iterator[bytes]:
+    """Stream rows as Parquet (one row group per chunk) or an Arrow IPC stream."""
+    if pa is None:
+        raise RuntimeError("Parquet/Arrow export requires pyarrow")
+
+    schema = _arrow_schema()
+    sink = _StreamSink()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+
+    try:
+        for chunk in _chunked(rows):
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,220 @@
+"""Bulk backfill of repository transfers from GH Archive files."""
+
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from database import RepoRadarDB
+from events_firehose import transfer_from_event
+
+logger = logging.getLogger(__name__)
+
+# Cheap byte-level prefilter: only lines containing one of these are JSON-decoded
+TRANSFER_MARKERS = (b'"TransferEvent"', b'"transferred"')
+
+# GH Archive events serialize ``repo`` as {"id":..,"name":..,..}, so the id and
+# name of every event can be read without decoding the whole line
+REPO_PATTERN = re.compile(rb'"repo":\{"id":(\d+),"name":"([^"]+)"')
+CREATED_PATTERN = re.compile(rb'"created_at":"([^"]+)"')
+
+# Ids of watched repositories, set once per worker process by ``_init_worker``
+_watched_ids: Set[int] = set()
+
+
+def archive_sort_key(path: str) -> Tuple:
+    """Order archives chronologically (``2015-01-01-9`` comes before ``2015-01-01-10``)."""
+    name = os.path.basename(path).split('.')[0]
+    parts = name.rsplit('-', 1)
+    if len(parts) == 2 and parts[1].isdigit():
+        return parts[0], int(parts[1])
+    return name, 0
+
+
+def iter_lines(path: str) -> Iterator[bytes]:
+    """Stream-decompress an archive line by line."""
+    with gzip.open(path, 'rb') as f:
+        for line in f:
+            yield line
+
+
+def iter_transfer_events(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """Decode only the lines that may hold an explicit transfer event."""
+    for line in lines:
+        if any(marker in line for marker in TRANSFER_MARKERS):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def scan_archive(path: str, watched_ids: Optional[Set[int]] = None) -> Dict:
+    """Scan one archive for transfers and sightings of watched repositories.
+
+    Returns the explicit transfers found, plus for every watched repository
+    id its first name in the file and each later name change, in file
+    order. The main process turns those sightings into transfers, since it
+    alone sees the archives in chronological order. Runs in a worker process.
+    """
+    watched_ids = _watched_ids if watched_ids is None else watched_ids
+    result = {'path': path, 'events': 0, 'transfers': [], 'sightings': [], 'error': None}
+    last_names = {}
+
+    def lines():
+        for line in iter_lines(path):
+            result['events'] += 1
+            if watched_ids:
+                match = REPO_PATTERN.search(line)
+                if match and int(match.group(1)) in watched_ids:
+                    repo_id, name = int(match.group(1)), match.group(2).decode()
+                    if last_names.get(repo_id) != name:
+                        last_names[repo_id] = name
+                        created = CREATED_PATTERN.search(line)
+                        result['sightings'].append(
+                            (repo_id, name, created.group(1).decode() if created else None)
+                        )
+            yield line
+
+    try:
+        for event in iter_transfer_events(lines()):
+            transfer = transfer_from_event(event)
+            if transfer:
+                result['transfers'].append(transfer)
+    except (OSError, EOFError, zlib.error) as e:
+        # GH Archive has a few truncated hours; keep what was read but don't checkpoint
+        result['error'] = str(e)
+    return result
+
+
+def _init_worker(watched_ids: Set[int]):
+    """Share the watched id set with a worker process once instead of per task."""
+    global _watched_ids
+    _watched_ids = watched_ids
+
+
+class ArchiveImporter:
+    """Import GH Archive hourly files into ``repo_transfers``.
+
+    Archives are scanned in parallel worker processes and their results
+    written by the main process in chronological order, one transaction
+    per archive. Each imported archive is checkpointed, so an interrupted
+    run resumes where it stopped; re-importing an archive is harmless
+    because transfers are deduplicated by their key.
+
+    Besides explicit transfer events, watched repositories (those with a
+    snapshot) are followed by id: when one shows up under a different
+    owner than where the archive last saw it, that's a transfer. The last
+    owner per id is kept in ``archive_owners`` so this also spans runs.
+    """
+
+    def __init__(self, db: RepoRadarDB, workers: Optional[int] = None):
+        """Initialize the importer; ``workers`` defaults to the CPU count."""
+        self.db = db
+        self.workers = workers or os.cpu_count() or 1
+        self.stats = {'archives': 0, 'skipped': 0, 'failed': 0, 'events': 0, 'transfers': 0}
+
+    def pending_archives(self, paths: Iterable[str]) -> List[str]:
+        """Sort archives chronologically and drop those already checkpointed."""
+        checkpoints = self.db.get_import_checkpoints()
+        pending = []
+        for path in sorted(set(paths), key=archive_sort_key):
+            if checkpoints.get(os.path.basename(path)) == os.path.getsize(path):
+                self.stats['skipped'] += 1
+                continue
+            pending.append(path)
+        return pending
+
+    def apply_result(self, result: Dict, owners: Dict[int, Dict], snapshots: Dict[int, Dict]):
+        """Store one archive's transfers and advance the owner history."""
+        transfers = list(result['transfers'])
+        changed_owners = {}
+        for repo_id, name, seen_at in result['sightings']:
+            owner = name.split('/')[0]
+            previous = owners.get(repo_id)
+            if previous and previous['owner'].lower() != owner.lower():
+                snapshot = snapshots.get(repo_id, {})
+                transfers.append({
+                    # Keyed like the tracker's transfers, by the watched name
+                    'repo': snapshot.get('repo') or name,
+                    'old_owner': previous['owner'],
+                    'new_owner': owner,
+                    'date': seen_at or '',
+                    'stars': snapshot.get('stars', 0),
+                    'language': snapshot.get('language')
+                })
+            owners[repo_id] = changed_owners[repo_id] = {
+                'repo_id': repo_id, 'repo': name, 'owner': owner, 'seen_at': seen_at or ''
+            }
+
+        statuses = self.db.add_transfers(transfers)
+        if 'error' in statuses:
+            result['error'] = 'could not store transfers'
+
+        self.stats['events'] += result['events']
+        self.stats['transfers'] += statuses.count('inserted')
+        if result['error']:
+            self.stats['failed'] += 1
+            logger.error(f"Importing {result['path']} failed: {result['error']}")
+            return
+
+        self.stats['archives'] += 1
+        self.db.save_import_checkpoint(
+            os.path.basename(result['path']), os.path.getsize(result['path']),
+            result['events'], len(transfers), list(changed_owners.values())
+        )
+
+    def run(self, paths: Iterable[str]) -> Dict:
+        """Import the given archives and return the run's counters."""
+        pending = self.pending_archives(paths)
+        logger.info(f"Importing {len(pending)} archives ({self.stats['skipped']} already imported)")
+        if not pending:
+            return self.stats
+
+        watched_ids = set(self.db.get_snapshot_ids())
+        snapshots = self.db.get_snapshots_by_id(watched_ids)
+        owners = self.db.get_archive_owners()
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(watched_ids,)) as executor:
+            # map() yields in submission order, so archives are applied chronologically
+            for result in executor.map(scan_archive, pending):
+                self.apply_result(result, owners, snapshots)
+                if result['error'] is None and self.stats['archives'] % 100 == 0:
+                    logger.info(f"Progress: {self.stats}")
+        return self.stats
+
+
+def main():
+    """Backfill transfers from GH Archive files on local disk."""
+    parser = argparse.ArgumentParser(description="Import repository transfers from GH Archive files")
+    parser.add_argument('archives', nargs='+',
+                        help="Archive files or directories of *.json.gz files")
+    parser.add_argument('--db', default=os.environ.get('DATABASE_PATH', 'reporadar.db'),
+                        help="Path to the SQLite database (default: $DATABASE_PATH or reporadar.db)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    paths = []
+    for arg in args.archives:
+        if os.path.isdir(arg):
+            paths.extend(glob.glob(os.path.join(arg, '*.json.gz')))
+        else:
+            paths.append(arg)
+
+    stats = ArchiveImporter(RepoRadarDB(args.db), workers=args.workers).run(paths)
+    print(f"Imported {stats['archives']} archives ({stats['skipped']} skipped, {stats['failed']} failed): "
+          f"{stats['events']} events, {stats['transfers']} new transfers")
+    if stats['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
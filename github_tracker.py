@@ -1,50 +1,142 @@
 """GitHub API client for tracking repository transfers."""
 
 import requests
+import json
 import logging
-import time
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Set, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+from requests.adapters import HTTPAdapter
 from database import RepoRadarDB
+from http_cache import HTTPCache
+from rate_limit import TokenPool, classify_throttle
 
 logger = logging.getLogger(__name__)
 
+# Fields fetched per repository by the GraphQL batch backend
+GRAPHQL_REPO_FIELDS = "databaseId nameWithOwner stargazerCount owner { login } primaryLanguage { name }"
+
+# Relative star drift below which a repository snapshot is not rewritten
+SNAPSHOT_STARS_TOLERANCE = 0.01
+
 
 class GitHubTracker:
     """GitHub API client for tracking repository ownership changes."""
 
-    def __init__(self, token: str, db: RepoRadarDB):
-        """Initialize GitHub tracker with API token and database."""
-        self.token = token
+    def __init__(self, token: Union[str, List[str]], db: RepoRadarDB, concurrency: int = 1,
+                 cache: Optional[HTTPCache] = None, backend: str = 'rest',
+                 api_url: str = 'https://api.github.com', graphql_url: Optional[str] = None,
+                 graphql_batch_size: int = 100, max_retries: int = 3):
+        """Initialize GitHub tracker with API token(s) and database.
+
+        ``token`` may be a single token or a list; requests are spread over
+        the pool by remaining rate limit budget. ``concurrency`` sets how
+        many repositories are checked in parallel by ``check_repositories``;
+        1 keeps the sequential behaviour. ``cache`` enables conditional
+        requests against an on-disk HTTP cache. ``backend`` selects how
+        repository metadata is looked up: ``rest`` (one call per repo),
+        ``graphql`` (``graphql_batch_size`` repos per call, with REST as the
+        fallback) or ``probe`` (a redirect probe per watched repo, full
+        metadata only for repos that moved). ``api_url``/``graphql_url`` can
+        point at a local stub server. ``max_retries`` bounds how often a
+        throttled request is re-queued.
+        """
+        if backend not in ('rest', 'graphql', 'probe'):
+            raise ValueError(f"Unknown GitHub backend: {backend}")
+
+        tokens = [token] if isinstance(token, str) else list(token)
+        self.token_pool = TokenPool(tokens)
         self.db = db
+        self.cache = cache
+        self.backend = backend
+        self.api_url = api_url.rstrip('/')
+        self.graphql_url = graphql_url or f"{self.api_url}/graphql"
+        self.graphql_batch_size = max(1, int(graphql_batch_size))
+        self.max_retries = max(0, int(max_retries))
+        self.concurrency = max(1, int(concurrency))
         self.session = requests.Session()
+        # Authorization is set per request by the token pool
         self.session.headers.update({
-            'Authorization': f'token {token}',
             'Accept': 'application/vnd.github.v3+json'
         })
-        self.rate_limit_reset = 0
-        self.remaining_requests = 5000
+        # Keep one pooled connection per worker so threads don't fight over sockets
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('https://', adapter)
+
+    def check_rate_limit(self) -> str:
+        """Check and handle GitHub API rate limits.
+
+        Returns the token to use for the next request, waiting only as
+        long as pacing, backoff or an exhausted pool requires.
+        """
+        return self.token_pool.acquire()
+
+    @staticmethod
+    def auth_headers(token: str) -> Dict[str, str]:
+        """Authorization header for a token."""
+        return {'Authorization': f'token {token}'}
+
+    def send(self, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+             **kwargs) -> Optional[requests.Response]:
+        """Send a paced request, re-queueing it when GitHub throttles it.
+
+        Throttled responses (secondary limits, 429, ``Retry-After``, spent
+        quota) are reported to the token pool and the request is retried up
+        to ``max_retries`` times once the pool allows it. Returns None if
+        it is still throttled after that or the request fails.
+        """
+        for attempt in range(self.max_retries + 1):
+            token = self.check_rate_limit()
+            request_headers = self.auth_headers(token)
+            request_headers.update(headers or {})
+
+            try:
+                response = self.session.request(method, url, headers=request_headers, **kwargs)
+            except Exception as e:
+                logger.error(f"Request error: {e}")
+                return None
+
+            throttle = classify_throttle(response.status_code, response.headers, response.text)
+            # Update rate limit info for the token that was used
+            self.token_pool.update(token, response.headers, throttled=throttle is not None,
+                                   status_code=response.status_code)
+            if throttle is None:
+                return response
+
+            kind, delay = throttle
+            delay = self.token_pool.penalize(token, kind, delay)
+            logger.warning(f"Throttled by GitHub ({kind} limit, {response.status_code}) on {url}; "
+                           f"re-queued after {delay:.0f}s (attempt {attempt + 1}/{self.max_retries + 1})")
 
-    def check_rate_limit(self):
-        """Check and handle GitHub API rate limits."""
-        if self.remaining_requests < 10:
-            sleep_time = max(0, self.rate_limit_reset - time.time())
-            if sleep_time > 0:
-                logger.warning(f"Rate limit reached. Sleeping for {sleep_time} seconds")
-                time.sleep(sleep_time + 1)
+        logger.error(f"Giving up on {url} after {self.max_retries + 1} throttled attempts")
+        return None
 
     def make_request(self, url: str) -> Optional[Dict]:
-        """Make a rate-limited request to GitHub API."""
-        self.check_rate_limit()
-        
+        """Make a rate-limited request to GitHub API.
+
+        When an HTTP cache is configured the request carries the stored
+        validators, and a 304 response is answered from the cache.
+        """
+        cached = self.cache.get(url) if self.cache else None
+
+        response = self.send('GET', url, headers=HTTPCache.conditional_headers(cached))
+        if response is None:
+            return None
+
         try:
-            response = self.session.get(url)
-            
-            # Update rate limit info
-            self.remaining_requests = int(response.headers.get('X-RateLimit-Remaining', 0))
-            self.rate_limit_reset = int(response.headers.get('X-RateLimit-Reset', 0))
-            
-            if response.status_code == 200:
+            if response.status_code == 304 and cached:
+                self.cache.record_hit(url)
+                return json.loads(cached['body'])
+            elif response.status_code == 200:
+                if self.cache:
+                    self.cache.record_miss()
+                    self.cache.store(
+                        url,
+                        response.text,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified')
+                    )
                 return response.json()
             elif response.status_code == 404:
                 logger.warning(f"Resource not found: {url}")
@@ -57,17 +149,143 @@ class GitHubTracker:
             logger.error(f"Request error: {e}")
             return None
 
+    def make_graphql_request(self, query: str) -> Optional[Dict]:
+        """Run a GraphQL query and return its ``data`` object.
+
+        Per-node errors (e.g. NOT_FOUND for one alias) are logged and the
+        partial data is still returned; a failed request returns None.
+        """
+        response = self.send('POST', self.graphql_url, json={'query': query})
+        if response is None:
+            return None
+
+        try:
+            if response.status_code != 200:
+                logger.error(f"GraphQL request failed: {response.status_code} - {response.text}")
+                return None
+
+            payload = response.json()
+            for error in payload.get('errors') or []:
+                logger.warning(f"GraphQL error: {error.get('type', 'ERROR')} - {error.get('message')}")
+            return payload.get('data')
+
+        except Exception as e:
+            logger.error(f"GraphQL request error: {e}")
+            return None
+
+    @staticmethod
+    def build_batch_query(repo_names: List[str]) -> str:
+        """Build one aliased GraphQL query (``r0``, ``r1``, ...) for a list of repos."""
+        parts = []
+        for i, repo_full_name in enumerate(repo_names):
+            owner, _, name = repo_full_name.partition('/')
+            parts.append(
+                f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) "
+                f"{{ {GRAPHQL_REPO_FIELDS} }}"
+            )
+        return "query {\n  " + "\n  ".join(parts) + "\n}"
+
+    @staticmethod
+    def graphql_to_repo_info(node: Dict) -> Dict:
+        """Convert a GraphQL repository node into the REST ``/repos`` shape used elsewhere."""
+        language = node.get('primaryLanguage') or {}
+        return {
+            'id': node.get('databaseId'),
+            'full_name': node.get('nameWithOwner'),
+            'owner': {'login': (node.get('owner') or {}).get('login')},
+            'stargazers_count': node.get('stargazerCount', 0),
+            'language': language.get('name')
+        }
+
+    def get_repos_info_batch(self, repo_names: List[str]) -> Dict[str, Dict]:
+        """Get repository info for many repositories via batched GraphQL queries.
+
+        Returns a mapping of repo name to REST-shaped info. Repos that could
+        not be resolved (failed batch, NOT_FOUND, moved repos GraphQL doesn't
+        redirect) are left out so callers can fall back to ``get_repo_info``.
+        """
+        names = [name for name in repo_names if name.count('/') == 1]
+        chunks = [
+            names[start:start + self.graphql_batch_size]
+            for start in range(0, len(names), self.graphql_batch_size)
+        ]
+
+        def fetch_chunk(chunk: List[str]) -> Dict[str, Dict]:
+            data = self.make_graphql_request(self.build_batch_query(chunk))
+            if not data:
+                return {}
+            resolved = {}
+            for i, name in enumerate(chunk):
+                node = data.get(f"r{i}")
+                if node:
+                    resolved[name] = self.graphql_to_repo_info(node)
+            return resolved
+
+        results = {}
+        if self.concurrency == 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                results.update(fetch_chunk(chunk))
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency,
+                                    thread_name_prefix='graphql-batch') as executor:
+                for resolved in executor.map(fetch_chunk, chunks):
+                    results.update(resolved)
+
+        logger.info(f"GraphQL batch resolved {len(results)}/{len(repo_names)} repositories "
+                    f"in {len(chunks)} requests")
+        return results
+
     def get_repo_info(self, repo_full_name: str) -> Optional[Dict]:
         """Get repository information including owner, stars, and language."""
-        url = f"https://api.github.com/repos/{repo_full_name}"
+        url = f"{self.api_url}/repos/{repo_full_name}"
         return self.make_request(url)
 
+    def probe_repository(self, snapshot: Dict) -> Tuple[str, Optional[str]]:
+        """Check whether a watched repository is still where it was last seen.
+
+        Sends a ``HEAD`` to the snapshot's last known full name without
+        following redirects, so no body is downloaded or parsed, carrying
+        the cached validators so an unchanged repository costs no quota.
+        GitHub answers a moved (transferred or renamed) repository with a
+        redirect to ``/repositories/{id}``. Returns ``(status, location)``
+        where ``status`` is ``same``, ``changed`` (metadata changed since
+        the cached copy; fetch ``location``), ``moved`` (with the redirect
+        target), ``missing`` or ``unknown`` (the caller should fetch full
+        metadata).
+        """
+        full_name = snapshot.get('full_name') or snapshot['repo']
+        url = f"{self.api_url}/repos/{full_name}"
+        cached = self.cache.get(url) if self.cache else None
+        response = self.send('HEAD', url, headers=HTTPCache.conditional_headers(cached),
+                             allow_redirects=False)
+        if response is None:
+            return 'unknown', None
+
+        if response.status_code == 304 and cached:
+            self.cache.record_hit(url)
+            return 'same', None
+        if response.status_code == 200:
+            # Stale or missing cache entry: a GET refreshes stars and the
+            # validators, so the next probe is a free 304
+            return ('changed', url) if self.cache else ('same', None)
+        if response.status_code in (301, 302, 307, 308):
+            location = response.headers.get('Location')
+            if location and location.rstrip('/').rsplit('/', 1)[-1] == str(snapshot.get('repo_id')):
+                return 'moved', location
+            return 'unknown', None
+        if response.status_code == 404:
+            return 'missing', None
+        return 'unknown', None
+
     def get_repo_events(self, repo_full_name: str, since: datetime = None) -> List[Dict]:
         """Get repository events, filtering for transfers."""
         if since is None:
-            since = datetime.now() - timedelta(hours=1)
+            since = datetime.now(timezone.utc) - timedelta(hours=1)
+        elif since.tzinfo is None:
+            # Event times are UTC; a naive ``since`` is taken as UTC too
+            since = since.replace(tzinfo=timezone.utc)
             
-        url = f"https://api.github.com/repos/{repo_full_name}/events"
+        url = f"{self.api_url}/repos/{repo_full_name}/events"
         events = self.make_request(url)
         
         if not events:
@@ -85,85 +303,286 @@ class GitHubTracker:
                 
         return transfer_events
 
+    def list_org_repos(self, org_name: str) -> Optional[List[Dict]]:
+        """List every repository of an organization.
+
+        The first page is requested directly to read its ``Link`` header;
+        the remaining pages, up to the ``last`` link, are then fetched
+        concurrently (and conditionally when the HTTP cache is enabled).
+        Returns None if any page failed, since a partial listing would look
+        like repositories leaving the organization.
+        """
+        url = f"{self.api_url}/orgs/{org_name}/repos?per_page=100&page=1"
+        response = self.send('GET', url)
+        if response is None or response.status_code != 200:
+            status = response.status_code if response is not None else 'no response'
+            logger.error(f"Listing repositories of org {org_name} failed: {status}")
+            return None
+
+        pages = [response.json()]
+        last_url = response.links.get('last', {}).get('url')
+        if last_url:
+            last_page = int(parse_qs(urlparse(last_url).query).get('page', ['1'])[0])
+            urls = [f"{self.api_url}/orgs/{org_name}/repos?per_page=100&page={page}"
+                    for page in range(2, last_page + 1)]
+            with ThreadPoolExecutor(max_workers=self.concurrency,
+                                    thread_name_prefix='org-pages') as executor:
+                pages.extend(executor.map(self.make_request, urls))
+        else:
+            # No ``last`` link: walk ``next`` links one at a time
+            next_url = response.links.get('next', {}).get('url')
+            while next_url:
+                response = self.send('GET', next_url)
+                if response is None or response.status_code != 200:
+                    pages.append(None)
+                    break
+                pages.append(response.json())
+                next_url = response.links.get('next', {}).get('url')
+
+        if any(page is None for page in pages):
+            logger.error(f"Listing repositories of org {org_name} is incomplete")
+            return None
+
+        repos = [repo for page in pages for repo in page]
+        logger.info(f"Found {len(repos)} repositories for org {org_name} in {len(pages)} pages")
+        return repos
+
     def get_org_repos(self, org_name: str) -> List[str]:
         """Get list of repository names for an organization."""
-        repos = []
-        page = 1
-        
-        while True:
-            url = f"https://api.github.com/orgs/{org_name}/repos?page={page}&per_page=100"
-            response = self.make_request(url)
-            
-            if not response or len(response) == 0:
-                break
-                
-            for repo in response:
-                repos.append(repo['full_name'])
-                
-            page += 1
-            
-        logger.info(f"Found {len(repos)} repositories for org {org_name}")
-        return repos
+        return [repo['full_name'] for repo in self.list_org_repos(org_name) or []]
+
+    def detect_ownership_change(self, repo_full_name: str,
+                                current_info: Optional[Dict] = None,
+                                snapshots: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """Detect if a repository has changed ownership by comparing with stored data.
 
-    def detect_ownership_change(self, repo_full_name: str) -> Optional[Dict]:
-        """Detect if a repository has changed ownership by comparing with stored data."""
-        current_info = self.get_repo_info(repo_full_name)
+        ``current_info`` may be passed in when the repository metadata was
+        already fetched (e.g. by a GraphQL batch) to avoid another request.
+        The current owner is diffed against the repository's last snapshot
+        (``snapshots`` mapping from ``RepoRadarDB.get_snapshots``, looked up
+        in the database when omitted), so a move is reported once rather
+        than on every cycle. Repositories without a snapshot fall back to
+        the owner segment of the configured name.
+        """
+        if current_info is None:
+            current_info = self.get_repo_info(repo_full_name)
         if not current_info:
             return None
 
+        if snapshots is None:
+            snapshots = self.db.get_snapshots([repo_full_name])
+        snapshot = snapshots.get(repo_full_name)
+
         current_owner = current_info['owner']['login']
-        
-        # For this prototype, we'll detect changes by checking if the owner
-        # differs from what we might expect based on the repo name
-        # In a real implementation, you'd store previous ownership data
-        
-        # Simple heuristic: if repo name suggests different owner than current
-        repo_name_parts = repo_full_name.split('/')
-        if len(repo_name_parts) == 2:
-            expected_owner, repo_name = repo_name_parts
-            if expected_owner.lower() != current_owner.lower():
-                return {
-                    'repo': repo_full_name,
-                    'old_owner': expected_owner,
-                    'new_owner': current_owner,
-                    'date': datetime.now().isoformat(),
-                    'stars': current_info.get('stargazers_count', 0),
-                    'language': current_info.get('language', 'Unknown')
-                }
+
+        if snapshot:
+            previous_owner = snapshot['owner']
+        else:
+            repo_name_parts = repo_full_name.split('/')
+            if len(repo_name_parts) != 2:
+                return None
+            previous_owner = repo_name_parts[0]
+
+        if previous_owner.lower() != current_owner.lower():
+            return {
+                'repo': repo_full_name,
+                'old_owner': previous_owner,
+                'new_owner': current_owner,
+                'date': datetime.now(timezone.utc).isoformat(),
+                'stars': current_info.get('stargazers_count', 0),
+                'language': current_info.get('language', 'Unknown')
+            }
         
         return None
 
-    def check_repositories(self, repo_list: List[str]) -> List[Dict]:
-        """Check a list of repositories for ownership changes."""
-        transfers = []
-        
-        for repo in repo_list:
-            logger.info(f"Checking repository: {repo}")
-            
-            # Get current repository info
+    @staticmethod
+    def build_snapshot(repo_full_name: str, repo_info: Dict) -> Dict:
+        """Build a ``repo_snapshots`` row from repository metadata."""
+        return {
+            'repo': repo_full_name,
+            'repo_id': repo_info.get('id'),
+            'owner': repo_info['owner']['login'],
+            'full_name': repo_info.get('full_name'),
+            'stars': repo_info.get('stargazers_count', 0) or 0,
+            'language': repo_info.get('language')
+        }
+
+    @staticmethod
+    def snapshot_changed(old: Optional[Dict], new: Dict) -> bool:
+        """Check whether a snapshot needs rewriting.
+
+        Star counts only count as a change once they drift by more than
+        ``SNAPSHOT_STARS_TOLERANCE`` so busy repos don't cause a write per cycle.
+        """
+        if not old:
+            return True
+        if (old['owner'] != new['owner'] or old['repo_id'] != new['repo_id']
+                or old['language'] != new['language']
+                or (new['full_name'] and old.get('full_name') != new['full_name'])):
+            return True
+        old_stars = old['stars'] or 0
+        return abs(new['stars'] - old_stars) > max(1, old_stars * SNAPSHOT_STARS_TOLERANCE)
+
+    def inspect_repository(self, repo: str, repo_info: Optional[Dict] = None,
+                           snapshots: Optional[Dict[str, Dict]] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Check a single repository without writing anything.
+
+        Returns ``(transfer, snapshot)`` where ``snapshot`` is the updated
+        snapshot row if it changed (None otherwise), so callers can persist
+        a whole cycle's results in one batch.
+        """
+        logger.info(f"Checking repository: {repo}")
+
+        # Get current repository info unless it was prefetched
+        if repo_info is None:
             repo_info = self.get_repo_info(repo)
-            if not repo_info:
-                continue
+        if not repo_info:
+            return None, None
+
+        if snapshots is None:
+            snapshots = self.db.get_snapshots([repo])
+
+        # Diff against the last known snapshot
+        transfer = self.detect_ownership_change(repo, repo_info, snapshots)
+
+        snapshot = self.build_snapshot(repo, repo_info)
+        if not self.snapshot_changed(snapshots.get(repo), snapshot):
+            snapshot = None
+
+        return transfer, snapshot
+
+    def check_repository(self, repo: str, repo_info: Optional[Dict] = None,
+                         snapshots: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """Check a single repository for an ownership change and store it.
+
+        The repository's snapshot is rewritten only when it changed.
+        """
+        transfer, snapshot = self.inspect_repository(repo, repo_info, snapshots)
+        stored = self.store_detections([transfer] if transfer else [], [snapshot] if snapshot else [])
+        return stored[0] if stored else None
 
-            # Check for ownership changes (simplified for prototype)
-            transfer = self.detect_ownership_change(repo)
+    def check_repositories(self, repo_list: List[str]) -> List[Dict]:
+        """Check a list of repositories for ownership changes.
+
+        Repositories are spread over ``self.concurrency`` worker threads;
+        results keep the order of ``repo_list``. With the GraphQL backend
+        metadata is prefetched in batches and only unresolved repos go
+        through the REST path. With the probe backend, watched repos are
+        first probed by redirect and only moved or unknown ones are fetched
+        in full. Detections are buffered and written in one
+        transaction at the end of the cycle.
+        """
+        prefetched = {}
+        if self.backend == 'graphql' and repo_list:
+            prefetched = self.get_repos_info_batch(repo_list)
+        infos = [prefetched.get(repo) for repo in repo_list]
+        snapshots = self.db.get_snapshots(repo_list)
+
+        if self.concurrency == 1 or len(repo_list) <= 1:
+            results = [self._safe_inspect_repository(repo, info, snapshots)
+                       for repo, info in zip(repo_list, infos)]
+        else:
+            with ThreadPoolExecutor(max_workers=self.concurrency,
+                                    thread_name_prefix='repo-check') as executor:
+                results = list(executor.map(
+                    lambda repo, info: self._safe_inspect_repository(repo, info, snapshots),
+                    repo_list, infos
+                ))
+
+        transfers = [transfer for transfer, _ in results if transfer]
+        changed_snapshots = [snapshot for _, snapshot in results if snapshot]
+        return self.store_detections(transfers, changed_snapshots)
+
+    def store_detections(self, transfers: List[Dict], snapshots: List[Dict]) -> List[Dict]:
+        """Persist a cycle's detections and return the transfers that were stored.
+
+        Transfers whose write failed are dropped from the result (so no
+        alert goes out for them) and keep their old snapshot, so the next
+        cycle detects them again.
+        """
+        statuses = self.db.save_detections(transfers, snapshots)
+        return [transfer for transfer, status in zip(transfers, statuses) if status != 'error']
+
+    def _safe_inspect_repository(self, repo: str, repo_info: Optional[Dict] = None,
+                                 snapshots: Optional[Dict[str, Dict]] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Run ``inspect_repository`` in a worker without letting one repo abort the cycle."""
+        try:
+            if self.backend == 'probe' and repo_info is None:
+                snapshot = (snapshots or {}).get(repo)
+                if self._can_probe(snapshot):
+                    status, location = self.probe_repository(snapshot)
+                    if status in ('same', 'missing'):
+                        return None, None
+                    if status in ('moved', 'changed'):
+                        repo_info = self.make_request(location)
+            return self.inspect_repository(repo, repo_info, snapshots)
+        except Exception as e:
+            logger.error(f"Error checking repository {repo}: {e}")
+            return None, None
+
+    @staticmethod
+    def _can_probe(snapshot: Optional[Dict]) -> bool:
+        """A repository can be probed once its id and owner are known."""
+        return bool(snapshot and snapshot.get('repo_id') and snapshot.get('owner'))
+
+    def check_organization(self, org: str) -> List[Dict]:
+        """Check an organization by diffing its repository ids against the last sweep.
+
+        Repositories that appeared are compared with any snapshot of the
+        same id (e.g. a watched repo transferred in) using the listing
+        itself, without extra requests. Repositories that disappeared are
+        looked up by id, and a different owner means they were transferred
+        out. Snapshots of current members are refreshed from the listing.
+        """
+        listing = self.list_org_repos(org)
+        if listing is None:
+            return []
+
+        current = {repo['id']: repo for repo in listing}
+        previous = self.db.get_org_repos(org)
+        by_id = self.db.get_snapshots_by_id(set(current) | set(previous))
+
+        inbound = [repo_id for repo_id in current if repo_id not in previous]
+        outbound = [repo_id for repo_id in previous if repo_id not in current]
+        logger.info(f"Organization {org}: {len(inbound)} new and {len(outbound)} departed "
+                    f"repositories out of {len(current)}")
+
+        def departed_info(repo_id: int) -> Optional[Dict]:
+            try:
+                return self.make_request(f"{self.api_url}/repositories/{repo_id}")
+            except Exception as e:
+                logger.error(f"Error looking up repository {repo_id}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.concurrency,
+                                thread_name_prefix='org-diff') as executor:
+            departed = dict(zip(outbound, executor.map(departed_info, outbound)))
+
+        transfers = []
+        changed_snapshots = []
+        candidates = [(repo_id, current[repo_id]) for repo_id in current]
+        candidates += [(repo_id, info) for repo_id, info in departed.items() if info]
+        for repo_id, info in candidates:
+            snapshot = by_id.get(repo_id)
+            repo = snapshot['repo'] if snapshot else previous.get(repo_id, info['full_name'])
+            snapshots = {repo: snapshot} if snapshot else {}
+            transfer = self.detect_ownership_change(repo, info, snapshots)
             if transfer:
                 transfers.append(transfer)
-                
-                # Store in database
-                self.db.add_transfer(
-                    repo=transfer['repo'],
-                    old_owner=transfer['old_owner'],
-                    new_owner=transfer['new_owner'],
-                    date=transfer['date'],
-                    stars=transfer['stars'],
-                    language=transfer['language']
-                )
-            
-            # Small delay to be respectful to API
-            time.sleep(0.1)
-            
-        return transfers
+            new_snapshot = self.build_snapshot(repo, info)
+            if self.snapshot_changed(snapshot, new_snapshot):
+                changed_snapshots.append(new_snapshot)
+
+        for repo_id, info in departed.items():
+            if not info:
+                logger.info(f"Repository {previous[repo_id]} left {org} and is no longer visible")
+
+        stored = self.store_detections(transfers, changed_snapshots)
+        if len(stored) < len(transfers):
+            # Keep the old membership so the next sweep diffs the same repositories again
+            return stored
+        self.db.save_org_repos(org, {repo_id: repo['full_name'] for repo_id, repo in current.items()})
+        return stored
 
     def check_organizations(self, org_list: List[str]) -> List[Dict]:
         """Check all repositories in given organizations for transfers."""
@@ -171,8 +590,11 @@ class GitHubTracker:
         
         for org in org_list:
             logger.info(f"Checking organization: {org}")
-            repos = self.get_org_repos(org)
-            transfers = self.check_repositories(repos)
+            try:
+                transfers = self.check_organization(org)
+            except Exception as e:
+                logger.error(f"Error checking organization {org}: {e}")
+                continue
             all_transfers.extend(transfers)
             
-        return all_transfers
\ No newline at end of file
+        return all_transfers
@@ -0,0 +1,149 @@
+"""On-disk HTTP cache for conditional GitHub API requests."""
+
+import sqlite3
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPCache:
+    """SQLite-backed cache of API response bodies keyed by URL.
+
+    Each entry keeps the ``ETag``/``Last-Modified`` validators of the last
+    200 response so the next request can be made conditional. GitHub
+    answers unchanged resources with ``304 Not Modified``, which does not
+    count against the rate limit, and the cached body is served instead.
+    """
+
+    def __init__(self, cache_path: str = "http_cache.db", max_bytes: int = 50 * 1024 * 1024):
+        """Open (or create) the cache file and load its current size."""
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.init_cache()
+
+    def init_cache(self):
+        """Create the cache table if it doesn't exist."""
+        with sqlite3.connect(self.cache_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_http_cache_accessed ON http_cache(accessed_at)"
+            )
+            row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM http_cache").fetchone()
+            self.total_bytes = row[0]
+            conn.commit()
+        logger.info(f"HTTP cache initialized ({self.total_bytes} bytes cached)")
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for ``url`` or None."""
+        try:
+            with self._lock, sqlite3.connect(self.cache_path) as conn:
+                conn.row_factory = sqlite3.Row
+                row = conn.execute(
+                    "SELECT etag, last_modified, body FROM http_cache WHERE url = ?",
+                    (url,)
+                ).fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error(f"Error reading HTTP cache: {e}")
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Build ``If-None-Match``/``If-Modified-Since`` headers from a cache entry."""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record_hit(self, url: str):
+        """Count a 304 served from cache and refresh the entry's LRU position."""
+        with self._lock:
+            self.hits += 1
+            try:
+                with sqlite3.connect(self.cache_path) as conn:
+                    conn.execute(
+                        "UPDATE http_cache SET accessed_at = ? WHERE url = ?",
+                        (time.time(), url)
+                    )
+                    conn.commit()
+            except Exception as e:
+                logger.error(f"Error updating HTTP cache: {e}")
+
+    def record_miss(self):
+        """Count a request that had to download the full body."""
+        with self._lock:
+            self.misses += 1
+
+    def store(self, url: str, body: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None):
+        """Store a response body with its validators, evicting old entries if needed."""
+        if not etag and not last_modified:
+            return  # Nothing to revalidate with, caching would never pay off
+
+        size = len(body.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        try:
+            with self._lock, sqlite3.connect(self.cache_path) as conn:
+                row = conn.execute("SELECT size FROM http_cache WHERE url = ?", (url,)).fetchone()
+                old_size = row[0] if row else 0
+                conn.execute(
+                    """INSERT OR REPLACE INTO http_cache
+                       (url, etag, last_modified, body, size, accessed_at)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (url, etag, last_modified, body, size, time.time())
+                )
+                self.total_bytes += size - old_size
+                self._evict(conn)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error writing HTTP cache: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        while self.total_bytes > self.max_bytes:
+            rows = conn.execute(
+                "SELECT url, size FROM http_cache ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for url, size in rows:
+                conn.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+                self.total_bytes -= size
+                self.evictions += 1
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self) -> Dict:
+        """Get cache hit/miss counters and current size."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'evictions': self.evictions,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes
+            }
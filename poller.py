@@ -0,0 +1,128 @@
+"""Standalone RepoRadar poller workers sharing a leased work queue."""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from database import RepoRadarDB
+from scheduler import PollTiers
+
+logger = logging.getLogger(__name__)
+
+# Longest an idle worker sleeps before looking for due work again
+MAX_IDLE_SECONDS = 30
+
+
+class Poller:
+    """Poll repositories and organizations leased from the ``work_queue`` table.
+
+    Any number of pollers (processes or hosts sharing the database) can
+    run at once: each leases a batch of due items, extends its leases with
+    a heartbeat while the batch is being checked, and releases the items
+    with their next due time. Leases of a worker that died expire after
+    ``lease_seconds`` and the items are picked up by another worker.
+    """
+
+    def __init__(self, check_fn: Callable[[List[str], List[str]], None], db: RepoRadarDB,
+                 tiers: PollTiers, worker_id: Optional[str] = None, batch_size: int = 100,
+                 lease_seconds: float = 300, heartbeat_interval: float = 60):
+        """Initialize a worker; ``check_fn(repositories, organizations)`` polls one batch."""
+        self.check_fn = check_fn
+        self.db = db
+        self.tiers = tiers
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.batch_size = max(1, batch_size)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = min(heartbeat_interval, lease_seconds / 2)
+        self.stats = {'batches': 0, 'polled': 0, 'last_batch_seconds': 0.0}
+
+    def sync(self, repositories: List[str], organizations: List[str]) -> Dict:
+        """Bring the shared queue in line with the configured watchlist."""
+        items = self.tiers.queue_items(self.db, repositories, organizations, time.time())
+        added, removed = self.db.sync_work_queue(items)
+        if added or removed:
+            logger.info(f"Work queue synced: {added} added, {removed} removed")
+        return {'added': added, 'removed': removed}
+
+    def _heartbeat(self, done: threading.Event):
+        """Keep this worker's leases alive until ``done`` is set."""
+        while not done.wait(self.heartbeat_interval):
+            self.db.heartbeat_work(self.worker_id, self.lease_seconds)
+
+    def run_once(self) -> int:
+        """Lease and poll one batch; returns how many items were polled."""
+        items = self.db.lease_work(self.worker_id, self.batch_size, self.lease_seconds)
+        if not items:
+            return 0
+
+        repositories = [item['name'] for item in items if item['kind'] == 'repo']
+        organizations = [item['name'] for item in items if item['kind'] == 'org']
+        logger.info(f"Worker {self.worker_id} leased {len(repositories)} repositories "
+                    f"and {len(organizations)} organizations")
+
+        started = time.time()
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(done,), daemon=True)
+        heartbeat.start()
+        try:
+            self.check_fn(repositories, organizations)
+        except Exception as e:
+            logger.error(f"Error during poll: {e}")
+        finally:
+            done.set()
+            heartbeat.join()
+
+        finished = time.time()
+        self.db.complete_work(self.worker_id, self.tiers.reschedule(self.db, items, finished))
+        self.stats['batches'] += 1
+        self.stats['polled'] += len(items)
+        self.stats['last_batch_seconds'] = round(finished - started, 1)
+        return len(items)
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """Poll until ``stop_event`` is set, sleeping while nothing is due."""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Poller {self.worker_id} started")
+        while not stop_event.is_set():
+            if self.run_once() == 0:
+                stop_event.wait(MAX_IDLE_SECONDS)
+
+
+def main():
+    """Run a standalone poller worker using the RepoRadar config."""
+    parser = argparse.ArgumentParser(description="Run a RepoRadar poller worker")
+    parser.add_argument('--worker-id', default=None, help="Name of this worker in lease records")
+    parser.add_argument('--firehose', action='store_true',
+                        help="Also follow the global events timeline (run on one worker only)")
+    args = parser.parse_args()
+
+    # Reuse the web app's component setup and check/alert path
+    import app
+
+    if not app.initialize_components():
+        raise SystemExit(1)
+
+    poller_config = app.config.get('poller', {})
+    poller = Poller(
+        app.check_repositories,
+        app.db,
+        app.build_poll_tiers(),
+        worker_id=args.worker_id,
+        batch_size=poller_config.get('batch_size', 100),
+        lease_seconds=poller_config.get('lease_seconds', 300),
+        heartbeat_interval=poller_config.get('heartbeat_interval', 60)
+    )
+    poller.sync(app.config.get('repositories', []), app.config.get('organizations', []))
+
+    if args.firehose:
+        app.start_firehose()
+    poller.run()
+
+
+if __name__ == '__main__':
+    main()
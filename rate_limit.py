@@ -0,0 +1,312 @@
+"""GitHub API rate limiting for RepoRadar.
+
+``TokenPool`` picks a token for every request and paces requests with a
+token bucket per credential, sized from the limit and reset window that
+GitHub reports. Throttled responses (secondary/abuse limits, 429s,
+``Retry-After``) are classified by ``classify_throttle`` and fed back into
+the pool so the request can be re-queued after the right delay.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default hourly quota of an authenticated token
+DEFAULT_RATE_LIMIT = 5000
+
+# Seconds in GitHub's primary rate limit window
+RATE_LIMIT_WINDOW = 3600
+
+# Share of the limit a token may spend in one burst before pacing kicks in
+BURST_FRACTION = 0.01
+
+# Backoff for secondary limits that come without a Retry-After header
+SECONDARY_BACKOFF_BASE = 60
+SECONDARY_BACKOFF_MAX = 900
+
+
+def classify_throttle(status_code: int, headers: Mapping[str, str],
+                      body: str = '') -> Optional[Tuple[str, Optional[float]]]:
+    """Tell whether a response means the request was throttled.
+
+    Returns None for responses that weren't throttled, otherwise
+    ``(kind, delay)`` where ``kind`` is ``primary`` (the token's hourly
+    quota is spent) or ``secondary`` (abuse/concurrency limit), and
+    ``delay`` is the server-advised wait in seconds, if any.
+    """
+    if status_code not in (403, 429):
+        return None
+
+    retry_after = headers.get('Retry-After')
+    if retry_after is not None:
+        try:
+            return 'secondary', max(0.0, float(retry_after))
+        except ValueError:
+            return 'secondary', None
+
+    if headers.get('X-RateLimit-Remaining') == '0':
+        reset = float(headers.get('X-RateLimit-Reset', 0) or 0)
+        return 'primary', max(0.0, reset - time.time())
+
+    text = (body or '').lower()
+    if status_code == 429 or 'secondary rate limit' in text or 'abuse' in text:
+        return 'secondary', None
+
+    # A plain 403 (e.g. missing permissions) is not a throttle
+    return None
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` burst, refilled at ``rate`` per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        """Add tokens for the time elapsed since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, now: float) -> bool:
+        """Take one token if available."""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def refund(self):
+        """Give back a token taken for a request that turned out to be free."""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available."""
+        if self.tokens >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float('inf')
+        return (1 - self.tokens) / self.rate
+
+    def configure(self, rate: float, capacity: float):
+        """Change the refill rate and burst size, keeping the current fill."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+
+class TokenPool:
+    """Pool of GitHub tokens with per-token rate limit accounting and pacing.
+
+    Every request is routed to the token with the most remaining budget
+    according to the ``X-RateLimit-*`` headers of its last response.
+    Each token's bucket refills at ``remaining / seconds until reset``, so
+    the pool spends its quota evenly across the window instead of
+    bursting and then sleeping. Requests that cost no quota (``304 Not
+    Modified``, or responses whose reported remaining didn't drop) give
+    their bucket token back, so pacing follows quota actually used. Tokens that drop below ``low_water`` are
+    parked until their reset, and a secondary limit pauses the whole pool
+    for ``Retry-After`` (or an exponential backoff).
+    """
+
+    def __init__(self, tokens: List[str], low_water: int = 10):
+        """Initialize the pool; duplicate and empty tokens are ignored."""
+        unique_tokens = list(dict.fromkeys(token for token in tokens if token))
+        if not unique_tokens:
+            raise ValueError("TokenPool needs at least one token")
+
+        self.low_water = low_water
+        self._state = {token: self._new_state() for token in unique_tokens}
+        self._blocked_until = 0.0
+        self._strikes = 0
+        self._stats = {
+            'requests': 0,
+            'free_requests': 0,
+            'paced_waits': 0,
+            'paced_seconds': 0.0,
+            'exhausted_waits': 0,
+            'throttled': 0,
+            'backoff_seconds': 0.0
+        }
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_state() -> Dict:
+        """Initial state of a token before any response was seen."""
+        return {
+            'remaining': DEFAULT_RATE_LIMIT,
+            'limit': DEFAULT_RATE_LIMIT,
+            'reset': 0.0,
+            'reported': None,  # Remaining from the last response, without local reservations
+            'bucket': TokenBucket(DEFAULT_RATE_LIMIT / RATE_LIMIT_WINDOW,
+                                  max(1.0, DEFAULT_RATE_LIMIT * BURST_FRACTION))
+        }
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def acquire(self) -> str:
+        """Reserve one request on the best available token.
+
+        Waits only as long as needed: for the next bucket token when
+        pacing, for ``Retry-After`` after a secondary limit, or for the
+        earliest reset when every token is exhausted.
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                monotonic_now = time.monotonic()
+                if self._blocked_until > now:
+                    wait, reason = self._blocked_until - now, 'backoff'
+                else:
+                    available = []
+                    for token, state in self._state.items():
+                        if state['remaining'] < self.low_water:
+                            if state['reset'] > now:
+                                continue  # Parked until reset
+                            self._roll_over(state)
+                        available.append(token)
+
+                    if not available:
+                        wait = min(state['reset'] for state in self._state.values()) - now + 1
+                        reason = 'exhausted'
+                    else:
+                        available.sort(key=lambda t: self._state[t]['remaining'], reverse=True)
+                        for token in available:
+                            state = self._state[token]
+                            if state['bucket'].try_consume(monotonic_now):
+                                # Reserve the request now so concurrent workers spread over tokens
+                                state['remaining'] -= 1
+                                self._stats['requests'] += 1
+                                return token
+                        wait = min(self._state[t]['bucket'].wait_time() for t in available)
+                        reason = 'paced'
+
+                wait = max(0.0, min(wait, RATE_LIMIT_WINDOW))
+                if reason == 'paced':
+                    self._stats['paced_waits'] += 1
+                    self._stats['paced_seconds'] += wait
+                elif reason == 'exhausted':
+                    self._stats['exhausted_waits'] += 1
+
+            if reason != 'paced':
+                logger.warning(f"Rate limiter waiting {wait:.0f} seconds ({reason})")
+            time.sleep(wait)
+
+    def _roll_over(self, state: Dict):
+        """Assume a full quota once a parked token's reset time has passed."""
+        state['remaining'] = state['limit']
+        state['reset'] = time.time() + RATE_LIMIT_WINDOW
+        self._pace(state)
+
+    def _pace(self, state: Dict):
+        """Size a token's bucket from its remaining budget and reset window."""
+        window = max(1.0, state['reset'] - time.time())
+        spendable = max(0, state['remaining'] - self.low_water)
+        state['bucket'].configure(
+            rate=spendable / window,
+            capacity=max(1.0, state['limit'] * BURST_FRACTION)
+        )
+
+    def update(self, token: str, headers: Mapping[str, str], throttled: bool = False,
+               status_code: Optional[int] = None):
+        """Record the rate limit state reported in a response's headers.
+
+        Responses from other rate limit resources (e.g. ``graphql``) and
+        responses without the headers leave the token's budget untouched;
+        a missing header never counts as an exhausted quota. A response
+        that wasn't throttled clears the secondary limit backoff. Within one
+        reset window remaining only goes down, so a higher value comes from
+        a response that arrived out of order and is ignored. A ``304`` or a
+        core response reporting the same remaining as the last one cost no
+        quota, so the request's reservation is returned.
+        """
+        with self._lock:
+            if not throttled:
+                self._strikes = 0
+            state = self._state.get(token)
+            if state is None:
+                return
+
+            resource = headers.get('X-RateLimit-Resource')
+            if resource not in (None, 'core'):
+                return
+            if 'X-RateLimit-Remaining' not in headers:
+                if status_code == 304:
+                    self._refund(state)
+                    state['remaining'] += 1
+                return
+
+            remaining = int(headers['X-RateLimit-Remaining'])
+            reset = float(headers.get('X-RateLimit-Reset', state['reset']))
+            same_window = state['reported'] is not None and reset == state['reset']
+            if same_window and remaining > state['reported']:
+                # A late response overtaken by a newer one: its count is stale
+                if status_code == 304 and not throttled:
+                    self._refund(state)
+                    state['remaining'] += 1
+                return
+            if not throttled and (status_code == 304 or (same_window and remaining == state['reported'])):
+                self._refund(state)
+
+            state['remaining'] = state['reported'] = remaining
+            if 'X-RateLimit-Limit' in headers:
+                state['limit'] = int(headers['X-RateLimit-Limit'])
+            state['reset'] = reset
+            self._pace(state)
+
+    def _refund(self, state: Dict):
+        """Return the bucket token of a request that cost no quota."""
+        state['bucket'].refund()
+        self._stats['free_requests'] += 1
+
+    def penalize(self, token: str, kind: str, delay: Optional[float] = None) -> float:
+        """Apply a throttled response and return how long the request is deferred.
+
+        ``primary`` parks the token until ``delay`` has passed; ``secondary``
+        pauses the whole pool, since GitHub applies those limits per user.
+        """
+        with self._lock:
+            self._stats['throttled'] += 1
+            now = time.time()
+            if kind == 'primary':
+                state = self._state.get(token)
+                if state is not None:
+                    state['remaining'] = 0
+                    state['reset'] = max(state['reset'], now + (delay or 0))
+                return delay or 0.0
+
+            if delay is None:
+                delay = min(SECONDARY_BACKOFF_MAX, SECONDARY_BACKOFF_BASE * 2 ** self._strikes)
+            self._strikes += 1
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._stats['backoff_seconds'] += delay
+            return delay
+
+    def stats(self) -> Dict:
+        """Get pacing counters and per-token budgets, with tokens masked for logging."""
+        with self._lock:
+            now = time.time()
+            return {
+                'pacing': {
+                    **self._stats,
+                    'paced_seconds': round(self._stats['paced_seconds'], 1),
+                    'blocked_for': max(0, int(self._blocked_until - now))
+                },
+                'tokens': [
+                    {
+                        'token': f"...{token[-4:]}",
+                        'remaining': state['remaining'],
+                        'limit': state['limit'],
+                        'rate_per_second': round(state['bucket'].rate, 3),
+                        'parked': state['remaining'] < self.low_water and state['reset'] > now,
+                        'reset_in': max(0, int(state['reset'] - now))
+                    }
+                    for token, state in self._state.items()
+                ]
+            }
@@ -0,0 +1,143 @@
+"""In-process response cache for the read-only RepoRadar endpoints."""
+
+import gzip
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+from flask import Response, make_response, request
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are served uncompressed; gzip overhead isn't worth it
+MIN_GZIP_BYTES = 512
+
+# Appended to the ETag of gzipped bodies: a strong ETag must differ between
+# the gzip and identity representations of the same entry
+GZIP_ETAG_SUFFIX = '-gz'
+
+
+class ResponseCache:
+    """Cache rendered responses until the database changes.
+
+    Entries are keyed by endpoint and query parameters and tagged with
+    the database write generation they were rendered at; a new generation
+    (i.e. the poller stored something) makes them stale. Bodies are
+    gzip-compressed once when the entry is filled, and every response
+    carries an ``ETag`` (suffixed for the gzipped body) so clients and
+    proxies can revalidate with a 304.
+    """
+
+    def __init__(self, generation_fn: Callable[[], Optional[int]],
+                 max_entries: int = 256, max_age: int = 60):
+        """Initialize the cache.
+
+        ``generation_fn`` returns the current write generation, or None
+        when it can't be read (caching is then bypassed).
+        """
+        self.generation_fn = generation_fn
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, view: Callable) -> Callable:
+        """Decorate a Flask view so its 200 responses are cached.
+
+        Streamed responses are passed through uncached but still get an
+        ``ETag``, so unchanged data is answered with a 304 next time.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            generation = self.generation_fn()
+            if generation is None:
+                return view(*args, **kwargs)
+
+            key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+            etag = self._etag(key, generation)
+
+            # Either representation is still current while the generation is
+            for candidate in (etag, etag + GZIP_ETAG_SUFFIX):
+                if request.if_none_match.contains(candidate):
+                    with self._lock:
+                        self.not_modified += 1
+                    return self._with_cache_headers(Response(status=304), candidate)
+
+            entry = self._lookup(key, generation)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if response.is_streamed:
+                    # Too large to hold in memory, but still revalidatable by ETag
+                    return self._with_cache_headers(response, etag)
+                entry = self._store(key, generation, response)
+
+            return self._serve(entry, etag)
+
+        return wrapper
+
+    @staticmethod
+    def _etag(key, generation: int) -> str:
+        """Build the (unquoted) entity tag for a cache key at a given generation."""
+        return hashlib.sha1(f"{generation}:{key!r}".encode('utf-8')).hexdigest()[:20]
+
+    def _lookup(self, key, generation: int) -> Optional[Dict]:
+        """Return a fresh entry for ``key`` or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['generation'] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def _store(self, key, generation: int, response: Response) -> Dict:
+        """Compress and store a rendered response."""
+        body = response.get_data()
+        entry = {
+            'generation': generation,
+            'content_type': response.headers.get('Content-Type'),
+            'body': body,
+            'gzip_body': gzip.compress(body, compresslevel=6) if len(body) >= MIN_GZIP_BYTES else None
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _serve(self, entry: Dict, etag: str) -> Response:
+        """Build a response from a cache entry, gzipped if the client accepts it."""
+        if entry['gzip_body'] is not None and 'gzip' in request.accept_encodings:
+            response = Response(entry['gzip_body'], content_type=entry['content_type'])
+            response.headers['Content-Encoding'] = 'gzip'
+            etag += GZIP_ETAG_SUFFIX
+        else:
+            response = Response(entry['body'], content_type=entry['content_type'])
+        return self._with_cache_headers(response, etag)
+
+    def _with_cache_headers(self, response: Response, etag: str) -> Response:
+        """Attach validator and caching headers."""
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = f"public, max-age={self.max_age}"
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    def stats(self) -> Dict:
+        """Get cache hit/miss counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified
+            }
@@ -0,0 +1,245 @@
+"""Priority-tiered polling scheduler for RepoRadar."""
+
+import heapq
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default poll interval per tier, in minutes
+DEFAULT_TIER_INTERVALS = {
+    'hot': 5,
+    'normal': 15,
+    'dormant': 120,
+    'organization': 15
+}
+
+# Longest the scheduler thread sleeps before re-checking its queue
+MAX_IDLE_SECONDS = 60
+
+
+class PollTiers:
+    """Assign watched repositories to polling tiers and compute due times.
+
+    ``hot`` is for repos with at least ``hot_min_stars`` stars or owned
+    by a target buyer, ``dormant`` for repos whose snapshot hasn't changed
+    in ``dormant_days``, ``normal`` otherwise. Organizations have their
+    own tier. Intervals are given in minutes and override
+    ``DEFAULT_TIER_INTERVALS``.
+    """
+
+    def __init__(self, tiers: Optional[Dict[str, float]] = None, hot_min_stars: int = 10000,
+                 target_buyers: Iterable[str] = (), dormant_days: int = 30):
+        self.intervals = {tier: minutes * 60 for tier, minutes
+                          in dict(DEFAULT_TIER_INTERVALS, **(tiers or {})).items()}
+        self.hot_min_stars = hot_min_stars
+        self.target_buyers = {buyer.lower() for buyer in target_buyers}
+        self.dormant_seconds = dormant_days * 86400
+
+    def tier_for(self, snapshot: Optional[Dict]) -> str:
+        """Pick the polling tier of a repository from its last snapshot."""
+        if not snapshot:
+            return 'normal'
+        if (snapshot.get('stars') or 0) >= self.hot_min_stars:
+            return 'hot'
+        if (snapshot.get('owner') or '').lower() in self.target_buyers:
+            return 'hot'
+        updated_at = snapshot.get('updated_at')
+        if updated_at:
+            try:
+                age = (datetime.utcnow() - datetime.strptime(updated_at, '%Y-%m-%d %H:%M:%S')).total_seconds()
+            except ValueError:
+                age = 0
+            if age > self.dormant_seconds:
+                return 'dormant'
+        return 'normal'
+
+    def first_due(self, kind: str, name: str, tier: str, now: float) -> float:
+        """Due time of a new item: a stable offset within its interval, derived from its name."""
+        return now + zlib.crc32(f"{kind}:{name}".encode()) / 2 ** 32 * self.intervals[tier]
+
+    def next_due(self, tier: str, due_at: float, finished: float) -> float:
+        """Due time after a poll, counted from the previous due time so polls don't drift.
+
+        A late poll is never followed by another within half an interval,
+        so items that fell behind don't get polled twice in a row.
+        """
+        interval = self.intervals[tier]
+        return max(due_at + interval, finished + interval / 2)
+
+    def queue_items(self, db, repositories: Iterable[str], organizations: Iterable[str],
+                    now: float) -> List[Dict]:
+        """Build first-time queue entries for the configured watchlist."""
+        repositories = list(repositories)
+        snapshots = db.get_snapshots(repositories) if repositories else {}
+        items = [('repo', repo, self.tier_for(snapshots.get(repo))) for repo in repositories]
+        items += [('org', org, 'organization') for org in organizations]
+        return [{'kind': kind, 'name': name, 'tier': tier,
+                 'due_at': self.first_due(kind, name, tier, now)}
+                for kind, name, tier in items]
+
+    def reschedule(self, db, items: Iterable[Dict], finished: float) -> List[Dict]:
+        """Re-tier polled items from their fresh snapshots and set their next due time."""
+        items = list(items)
+        repositories = [item['name'] for item in items if item['kind'] == 'repo']
+        snapshots = db.get_snapshots(repositories) if repositories else {}
+        rescheduled = []
+        for item in items:
+            tier = (self.tier_for(snapshots.get(item['name'])) if item['kind'] == 'repo'
+                    else 'organization')
+            rescheduled.append(dict(item, tier=tier,
+                                    due_at=self.next_due(tier, item['due_at'], finished)))
+        return rescheduled
+
+    def counts(self, tiers: Iterable[str]) -> Dict[str, int]:
+        """Count items per tier."""
+        counts = {}
+        for tier in tiers:
+            counts[tier] = counts.get(tier, 0) + 1
+        return counts
+
+
+class PollScheduler:
+    """Poll repositories and organizations from a queue ordered by next due time.
+
+    Every watched repository is assigned a tier by ``PollTiers`` and polled
+    at that tier's interval. First due times are spread over each interval
+    by a stable hash of the name, so polls don't arrive in one burst.
+
+    A single thread pops whatever is due, checks it in one batch (so the
+    tracker can still parallelize and batch lookups), and sleeps until the
+    next item is due. A batch that runs long delays later items rather
+    than skipping them; the delay is reported as lag by ``stats``.
+    """
+
+    def __init__(self, check_fn: Callable[[List[str], List[str]], None], db,
+                 repositories: Iterable[str] = (), organizations: Iterable[str] = (),
+                 tiers: Optional[PollTiers] = None, max_batch: int = 500):
+        """Initialize the scheduler.
+
+        ``check_fn(repositories, organizations)`` polls one batch; ``tiers``
+        defaults to ``PollTiers()`` with the default intervals.
+        """
+        self.check_fn = check_fn
+        self.db = db
+        self.tiers = tiers or PollTiers()
+        self.max_batch = max(1, max_batch)
+        self._queue: List[Tuple[float, str, str]] = []
+        self._item_tiers: Dict[Tuple[str, str], str] = {}
+        self._run_lock = threading.Lock()
+        self._queue_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {
+            'batches': 0,
+            'polled': 0,
+            'skipped_overlaps': 0,
+            'last_batch_size': 0,
+            'last_batch_seconds': 0.0,
+            'last_lag_seconds': 0.0,
+            'max_lag_seconds': 0.0
+        }
+
+        for item in self.tiers.queue_items(db, repositories, organizations, time.time()):
+            self._enqueue(item)
+
+    def _enqueue(self, item: Dict):
+        """Queue an item (``kind``, ``name``, ``tier``, ``due_at``)."""
+        with self._queue_lock:
+            self._item_tiers[(item['kind'], item['name'])] = item['tier']
+            heapq.heappush(self._queue, (item['due_at'], item['kind'], item['name']))
+
+    def _pop_due(self, now: float) -> List[Tuple[float, str, str]]:
+        """Take the items due by ``now``, oldest first, up to ``max_batch``."""
+        due = []
+        with self._queue_lock:
+            while self._queue and self._queue[0][0] <= now and len(due) < self.max_batch:
+                due.append(heapq.heappop(self._queue))
+        return due
+
+    def run_pending(self) -> int:
+        """Poll everything that is due; returns how many items were polled.
+
+        Returns 0 without polling if another batch is still running.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            self._stats['skipped_overlaps'] += 1
+            logger.warning("Previous polling batch still running, not starting another")
+            return 0
+        try:
+            started = time.time()
+            due = self._pop_due(started)
+            if not due:
+                return 0
+
+            lag = started - due[0][0]
+            self._stats['last_lag_seconds'] = round(lag, 1)
+            self._stats['max_lag_seconds'] = round(max(self._stats['max_lag_seconds'], lag), 1)
+
+            repositories = [name for _, kind, name in due if kind == 'repo']
+            organizations = [name for _, kind, name in due if kind == 'org']
+            try:
+                self.check_fn(repositories, organizations)
+            except Exception as e:
+                logger.error(f"Error during scheduled poll: {e}")
+
+            finished = time.time()
+            polled = [{'kind': kind, 'name': name, 'due_at': due_at} for due_at, kind, name in due]
+            for item in self.tiers.reschedule(self.db, polled, finished):
+                self._enqueue(item)
+
+            self._stats['batches'] += 1
+            self._stats['polled'] += len(due)
+            self._stats['last_batch_size'] = len(due)
+            self._stats['last_batch_seconds'] = round(finished - started, 1)
+            return len(due)
+        finally:
+            self._run_lock.release()
+
+    def seconds_until_due(self) -> float:
+        """Seconds until the next item is due (0 if something is overdue)."""
+        with self._queue_lock:
+            if not self._queue:
+                return MAX_IDLE_SECONDS
+            return max(0.0, min(MAX_IDLE_SECONDS, self._queue[0][0] - time.time()))
+
+    def run(self):
+        """Poll due items until ``stop`` is called."""
+        while not self._stop.is_set():
+            self.run_pending()
+            self._wake.wait(self.seconds_until_due())
+            self._wake.clear()
+
+    def start(self) -> threading.Thread:
+        """Run the scheduler in a daemon thread."""
+        self._thread = threading.Thread(target=self.run, name='poll-scheduler', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Stop the scheduler thread after its current batch."""
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        """Get queue size, current lag and per-tier counts."""
+        now = time.time()
+        with self._queue_lock:
+            overdue = [due_at for due_at, _, _ in self._queue if due_at <= now]
+            tiers = self.tiers.counts(self._item_tiers.values())
+            next_due = self._queue[0][0] - now if self._queue else None
+        return {
+            **self._stats,
+            'queued': len(self._item_tiers),
+            'overdue': len(overdue),
+            'lag_seconds': round(now - min(overdue), 1) if overdue else 0.0,
+            'next_due_in': round(next_due, 1) if next_due is not None else None,
+            'tiers': tiers,
+            'intervals_minutes': {tier: round(seconds / 60, 2)
+                                  for tier, seconds in self.tiers.intervals.items()}
+        }
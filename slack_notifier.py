@@ -2,25 +2,55 @@
 
 import requests
 import logging
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from alert_rules import AlertRules
 
 logger = logging.getLogger(__name__)
 
+# Transfers listed in one batch message; the outbox sends larger batches in several
+MAX_BATCH_LINES = 10
+
+# Retry backoff for failed deliveries, in seconds
+RETRY_BACKOFF_BASE = 5
+RETRY_BACKOFF_MAX = 600
+
 
 class SlackNotifier:
-    """Slack webhook notifier for repository transfer alerts."""
+    """Slack webhook notifier for repository transfer alerts.
+
+    With a database, alerts are written to the ``slack_outbox`` table and
+    delivered by a background sender (``start``). The sender waits
+    ``coalesce_seconds`` so alerts arriving together go out as one
+    message, sends at most one message per ``min_interval`` seconds (Slack
+    allows about one per second per webhook) and retries failures with
+    exponential backoff. Polling never waits on Slack and alerts survive
+    restarts. Without a database, messages are posted inline.
+    """
 
-    def __init__(self, webhook_url: Optional[str] = None):
-        """Initialize Slack notifier with webhook URL."""
+    def __init__(self, webhook_url: Optional[str] = None, db=None,
+                 coalesce_seconds: float = 5, min_interval: float = 1.0,
+                 max_attempts: int = 8):
+        """Initialize Slack notifier with webhook URL and optional outbox database."""
         self.webhook_url = webhook_url
         self.enabled = webhook_url is not None
+        self.db = db
+        self.coalesce_seconds = coalesce_seconds
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.stats = {'sent': 0, 'failed_attempts': 0, 'queued': 0}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_post = 0.0
+        self._rules = None
+        self._rules_key = None
 
-    def send_message(self, message: str, title: str = "RepoRadar Alert") -> bool:
-        """Send a message to Slack."""
-        if not self.enabled:
-            logger.warning("Slack notifications not configured")
-            return False
-
+    def _post(self, message: str, title: str) -> Tuple[bool, Optional[float], str]:
+        """Post one message; returns ``(ok, retry_after, error)``."""
         payload = {
             "text": title,
             "attachments": [
@@ -33,32 +63,44 @@ class SlackNotifier:
         }
 
         try:
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
+            response = self.session.post(self.webhook_url, json=payload, timeout=10)
             if response.status_code == 200:
-                logger.info("Slack notification sent successfully")
-                return True
-            else:
-                logger.error(f"Slack notification failed: {response.status_code}")
-                return False
+                return True, None, ''
+            retry_after = response.headers.get('Retry-After')
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            return False, retry_after, f"HTTP {response.status_code}"
         except Exception as e:
-            logger.error(f"Error sending Slack notification: {e}")
+            return False, None, str(e)
+
+    def send_message(self, message: str, title: str = "RepoRadar Alert") -> bool:
+        """Send a message to Slack."""
+        if not self.enabled:
+            logger.warning("Slack notifications not configured")
             return False
 
-    def should_alert(self, transfer: Dict, target_buyers: List[str], min_stars: int = 1000) -> bool:
+        ok, _, error = self._post(message, title)
+        if ok:
+            logger.info("Slack notification sent successfully")
+        else:
+            logger.error(f"Slack notification failed: {error}")
+        return ok
+
+    def compiled_rules(self, target_buyers: List[str], min_stars: int = 1000) -> AlertRules:
+        """Get compiled rules for a buyer list and threshold, compiling them only once."""
+        key = (tuple(target_buyers), min_stars)
+        if self._rules_key != key:
+            self._rules = AlertRules(min_stars=min_stars, target_buyers=target_buyers)
+            self._rules_key = key
+        return self._rules
+
+    def should_alert(self, transfer: Dict, target_buyers: List[str], min_stars: int = 1000,
+                     rules: Optional[AlertRules] = None) -> bool:
         """Check if a transfer should trigger an alert."""
-        stars = transfer.get('stars', 0)
-        new_owner = transfer.get('new_owner', '').lower()
-        
-        # Alert if stars >= threshold
-        if stars >= min_stars:
-            return True
-            
-        # Alert if buyer matches target list
-        for buyer in target_buyers:
-            if buyer.lower() in new_owner:
-                return True
-                
-        return False
+        rules = rules or self.compiled_rules(target_buyers, min_stars)
+        return rules.match(transfer) is not None
 
     def format_transfer_message(self, transfer: Dict) -> str:
         """Format a repository transfer into a Slack message."""
@@ -78,31 +120,23 @@ class SlackNotifier:
         
         return message
 
-    def send_transfer_alert(self, transfer: Dict, target_buyers: List[str], min_stars: int = 1000) -> bool:
+    def send_transfer_alert(self, transfer: Dict, target_buyers: List[str], min_stars: int = 1000,
+                            rules: Optional[AlertRules] = None) -> bool:
         """Send an alert for a repository transfer if it meets criteria."""
-        if not self.should_alert(transfer, target_buyers, min_stars):
+        if not self.should_alert(transfer, target_buyers, min_stars, rules):
             return False
 
         message = self.format_transfer_message(transfer)
         return self.send_message(message, "🔔 High-Value Repository Transfer")
 
-    def send_batch_alert(self, transfers: List[Dict], target_buyers: List[str], min_stars: int = 1000) -> bool:
-        """Send a batch alert for multiple transfers."""
-        qualifying_transfers = [
-            t for t in transfers 
-            if self.should_alert(t, target_buyers, min_stars)
-        ]
-        
-        if not qualifying_transfers:
-            return False
-
-        if len(qualifying_transfers) == 1:
-            return self.send_transfer_alert(qualifying_transfers[0], target_buyers, min_stars)
+    def format_batch_message(self, transfers: List[Dict]) -> Tuple[str, str]:
+        """Format transfers into a ``(message, title)`` pair for one Slack message."""
+        if len(transfers) == 1:
+            return self.format_transfer_message(transfers[0]), "🔔 High-Value Repository Transfer"
 
-        # Multiple transfers
-        message = f"🚨 *{len(qualifying_transfers)} High-Value Repository Transfers Detected*\n\n"
+        message = f"🚨 *{len(transfers)} High-Value Repository Transfers Detected*\n\n"
         
-        for i, transfer in enumerate(qualifying_transfers[:10], 1):  # Limit to 10 for message size
+        for i, transfer in enumerate(transfers[:MAX_BATCH_LINES], 1):  # Limit for message size
             repo = transfer.get('repo', 'Unknown')
             old_owner = transfer.get('old_owner', 'Unknown')
             new_owner = transfer.get('new_owner', 'Unknown')
@@ -110,7 +144,101 @@ class SlackNotifier:
             
             message += f"{i}. `{repo}` ({old_owner} → {new_owner}) ⭐ {stars:,}\n"
         
-        if len(qualifying_transfers) > 10:
-            message += f"\n...and {len(qualifying_transfers) - 10} more transfers"
-            
-        return self.send_message(message, "🔔 Multiple Repository Transfers")
\ No newline at end of file
+        if len(transfers) > MAX_BATCH_LINES:
+            message += f"\n...and {len(transfers) - MAX_BATCH_LINES} more transfers"
+
+        return message, "🔔 Multiple Repository Transfers"
+
+    def send_batch_alert(self, transfers: List[Dict], target_buyers: Optional[List[str]] = None,
+                         min_stars: int = 1000, rules: Optional[AlertRules] = None) -> bool:
+        """Send a batch alert for multiple transfers.
+
+        ``rules`` (compiled from the full ``alerts`` config) takes precedence
+        over ``target_buyers``/``min_stars``. With an outbox the qualifying
+        transfers are queued for the background sender and this returns as
+        soon as they are stored.
+        """
+        rules = rules or self.compiled_rules(target_buyers or [], min_stars)
+        qualifying_transfers = rules.filter(transfers)
+        
+        if not qualifying_transfers:
+            return False
+
+        if self.db is not None and self.enabled:
+            queued = self.db.enqueue_alerts(qualifying_transfers)
+            self.stats['queued'] += queued
+            self._wake.set()
+            return queued > 0
+
+        message, title = self.format_batch_message(qualifying_transfers)
+        return self.send_message(message, title)
+
+    def deliver_pending(self) -> int:
+        """Send one coalesced batch from the outbox; returns how many alerts it held."""
+        alerts = self.db.claim_alerts(MAX_BATCH_LINES, claim_seconds=60,
+                                      settle_seconds=self.coalesce_seconds)
+        if not alerts:
+            return 0
+
+        # Pace posts to Slack's per-webhook limit
+        wait = self._last_post + self.min_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+        message, title = self.format_batch_message([alert['transfer'] for alert in alerts])
+        ok, retry_after, error = self._post(message, title)
+        self._last_post = time.time()
+        ids = [alert['id'] for alert in alerts]
+
+        if ok:
+            self.db.delete_alerts(ids)
+            self.stats['sent'] += len(alerts)
+            logger.info(f"Slack notification sent successfully ({len(alerts)} transfers)")
+        else:
+            attempts = max(alert['attempts'] for alert in alerts)
+            delay = retry_after if retry_after is not None else min(
+                RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** attempts)
+            self.db.defer_alerts(ids, delay, error, self.max_attempts)
+            self.stats['failed_attempts'] += 1
+            logger.error(f"Slack notification failed: {error}; retrying {len(alerts)} alerts "
+                         f"in {delay:.0f}s (attempt {attempts + 1}/{self.max_attempts})")
+        return len(alerts)
+
+    def run(self):
+        """Deliver queued alerts until ``stop`` is called."""
+        while not self._stop.is_set():
+            try:
+                if self.deliver_pending():
+                    continue
+            except Exception as e:
+                logger.error(f"Error delivering Slack alerts: {e}")
+
+            next_due = self.db.next_alert_due()
+            if next_due is None:
+                timeout = 60
+            else:
+                # Ready alerts may still be settling for the coalescing window
+                timeout = max(next_due - time.time(), 0) + self.coalesce_seconds
+            self._wake.wait(min(60, max(0.1, timeout)))
+            self._wake.clear()
+
+    def start(self) -> Optional[threading.Thread]:
+        """Start the background sender if notifications and the outbox are configured."""
+        if not self.enabled or self.db is None:
+            return None
+        thread = threading.Thread(target=self.run, name='slack-sender', daemon=True)
+        thread.start()
+        logger.info("Slack sender started")
+        return thread
+
+    def stop(self):
+        """Stop the background sender after its current message."""
+        self._stop.set()
+        self._wake.set()
+
+    def outbox_stats(self) -> Dict:
+        """Get delivery counters and the outbox backlog."""
+        stats = dict(self.stats)
+        if self.db is not None:
+            stats.update(self.db.get_outbox_stats())
+        return stats
\ No newline at end of file